@@ -13,21 +13,51 @@ from routes.route import router as reroute_router
 from routes.privacy import router as privacy_router  # ← NEW
 
 # new imports for /transcribe
+import asyncio
 import os
+from contextlib import asynccontextmanager
 import tempfile
 import requests
-import re
 
 from utils.openai_client import ask_openai
+from services.tts_warmup import warm_tts_cache
+from utils.geo_cache import haversine_m
+from utils.geometry import DEFAULT_ZOOMS, GEOMETRY_FORMATS, route_geometry
+from utils.route_match import POLYLINE_LINES
+from utils.route_session import ROUTE_SESSIONS
 from utils.maps_client import (
-    get_place_coordinates,
-    autocomplete_place,
-    place_details,
-    get_directions,
-    find_transport_spots,
+    get_place_coordinates_async,
+    autocomplete_place_async,
+    place_details_async,
+    fetch_route_async,
+    DirectionsError,
+    find_transport_spots_async,
+    _parse_latlng,
+    DIRECTIONS_CACHE,
+    GEOCODE_CACHE,
+    AUTOCOMPLETE_CACHE,
+    PLACE_DETAILS_CACHE,
+    MAPS_SINGLE_FLIGHT,
+    TRANSPORT_CACHE,
+    TERMINAL_INDEX,
+    POI_STORE,
 )
 
-app = FastAPI()
+TTS_WARMUP_ON_STARTUP = os.getenv("TTS_WARMUP_ON_STARTUP", "0") == "1"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warmup = None
+    if TTS_WARMUP_ON_STARTUP:
+        # background: the server takes requests while the phrase cache fills
+        warmup = asyncio.create_task(warm_tts_cache())
+    yield
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # ✅ streaming TTS first (GET /tts)
 app.include_router(tts_router)
@@ -56,12 +86,12 @@ class SimplifyPayload(BaseModel):
 #     clean = re.sub(r"<[^>]+>", "", s or "")
 #     return html.unescape(clean).strip()
 
-def _strip_html_tags(s: str) -> str:
-    """Remove HTML tags and unescape entities."""
-    if not s:
-        return ""
-    clean = re.sub(r"<[^>]+>", "", s)
-    return html.unescape(clean).strip()
+# DirectionsError.code -> (HTTP status, error code, message)
+DIRECTIONS_ERRORS = {
+    "FETCH_FAILED": (502, "DIRECTIONS_FETCH_FAILED", "Could not fetch directions from provider."),
+    "API_STATUS": (400, "DIRECTIONS_API", "Google Directions returned an error."),
+    "PARSE_FAILED": (500, "INTERNAL_ROUTE_ERROR", "Internal routing engine failed."),
+}
 
 def _get_latlng_from_loc(loc: dict) -> Tuple[float, float]:
     """Extract lat/lng from a Google location dict {lat: .., lng: ..}"""
@@ -70,23 +100,58 @@ def _get_latlng_from_loc(loc: dict) -> Tuple[float, float]:
     return (loc.get("lat") or loc.get("latitude"), loc.get("lng") or loc.get("longitude"))
 
 
-def _attach_transport_spots(route_obj: Dict[str, Any], origin: str, destination: str, mode: str) -> Dict[str, Any]:
-    """Attach nearby sakayan spots for long walking routes."""
+# Straight-line distance above which transport-spot discovery starts alongside the
+# Directions call; a walking route is never shorter than the crow-flies distance
+TRANSPORT_PREFETCH_MIN_M = 800
+
+
+async def _find_transport_spots_safe(origin: Any, destination: Any) -> List[Dict[str, Any]]:
+    try:
+        return await find_transport_spots_async(origin=origin, destination=destination, radius_m=1400, max_results=6)
+    except Exception as e:
+        print("Transport spot detection failed:", e)
+        return []
+
+
+def _prefetch_transport_spots(origin: str, destination: str, mode: str) -> Optional[asyncio.Task]:
+    """Start sakayan discovery before Directions returns when both endpoints are 'lat,lng'."""
+    if mode != "walking":
+        return None
+    origin_coords = _parse_latlng(origin)
+    destination_coords = _parse_latlng(destination)
+    if not origin_coords or not destination_coords:
+        return None
+    straight_m = haversine_m(origin_coords["lat"], origin_coords["lng"], destination_coords["lat"], destination_coords["lng"])
+    if straight_m < TRANSPORT_PREFETCH_MIN_M:
+        return None
+    return asyncio.create_task(_find_transport_spots_safe(origin, destination))
+
+
+async def _attach_transport_spots(
+    route_obj: Dict[str, Any],
+    origin: str,
+    destination: str,
+    mode: str,
+    prefetch: Optional[asyncio.Task] = None,
+) -> Dict[str, Any]:
+    """Attach nearby sakayan spots for long walking routes, joining a prefetch task if one was started."""
     if mode != "walking" or not isinstance(route_obj, dict):
+        if prefetch:
+            prefetch.cancel()
         return route_obj
 
     distance_value = ((route_obj.get("distance") or {}).get("value") if isinstance(route_obj.get("distance"), dict) else None)
     if isinstance(distance_value, (int, float)) and distance_value < 1000:
+        if prefetch:
+            prefetch.cancel()
         route_obj["transport_spots"] = []
         return route_obj
 
-    destination_loc = route_obj.get("destination") if isinstance(route_obj.get("destination"), dict) else destination
-
-    try:
-        spots = find_transport_spots(origin=origin, destination=destination_loc, radius_m=1400, max_results=6)
-    except Exception as e:
-        print("Transport spot detection failed:", e)
-        spots = []
+    if prefetch:
+        spots = await prefetch
+    else:
+        destination_loc = route_obj.get("destination") if isinstance(route_obj.get("destination"), dict) else destination
+        spots = await _find_transport_spots_safe(origin, destination_loc)
 
     route_obj["transport_spots"] = spots
     return route_obj
@@ -96,6 +161,23 @@ def home():
     return {"message": "TARA AI backend running!"}
 
 
+@app.get("/maps/stats")
+async def maps_stats():
+    return {
+        "status": "ok",
+        "directions_cache": DIRECTIONS_CACHE.stats(),
+        "geocode_cache": GEOCODE_CACHE.stats(),
+        "autocomplete_cache": AUTOCOMPLETE_CACHE.stats(),
+        "place_details_cache": PLACE_DETAILS_CACHE.stats(),
+        "transport_cache": TRANSPORT_CACHE.stats(),
+        "terminal_index": TERMINAL_INDEX.stats(),
+        "poi_store": POI_STORE.stats(),
+        "single_flight": MAPS_SINGLE_FLIGHT.stats(),
+        "route_sessions": ROUTE_SESSIONS.stats(),
+        "polyline_lines": POLYLINE_LINES.stats(),
+    }
+
+
 @app.post("/ask")
 def ask_route(payload: Question):
     answer = ask_openai(payload.question)
@@ -106,8 +188,8 @@ def ask_route(payload: Question):
 # GEOCODE — existing
 # -------------------------------------------------------
 @app.get("/geocode")
-def geocode(place: str = Query(..., description="Place name to search for")):
-    coords = get_place_coordinates(place)
+async def geocode(place: str = Query(..., description="Place name to search for")):
+    coords = await get_place_coordinates_async(place)
 
     if coords is None:
         return JSONResponse(
@@ -126,9 +208,9 @@ def geocode(place: str = Query(..., description="Place name to search for")):
 # SEARCH / AUTOCOMPLETE
 # -------------------------------------------------------
 @app.get("/search")
-def search(q: str = Query(..., description="Query text for place autocomplete"),
+async def search(q: str = Query(..., description="Query text for place autocomplete"),
            session: Optional[str] = Query(None, description="Optional session token")):
-    preds = autocomplete_place(q, session_token=session)
+    preds = await autocomplete_place_async(q, session_token=session)
     if not preds:
         return {"predictions": [], "status": "no_results"}
     return {"predictions": preds, "status": "ok"}
@@ -138,8 +220,8 @@ def search(q: str = Query(..., description="Query text for place autocomplete"),
 # PLACE DETAILS (place_id -> lat,lng,address)
 # -------------------------------------------------------
 @app.get("/placedetails")
-def get_place(place_id: str = Query(..., description="Google place_id")):
-    details = place_details(place_id)
+async def get_place(place_id: str = Query(..., description="Google place_id")):
+    details = await place_details_async(place_id)
     if details is None:
         raise HTTPException(status_code=404, detail="place not found")
     return {"status": "ok", "place": details}
@@ -149,14 +231,14 @@ def get_place(place_id: str = Query(..., description="Google place_id")):
 # TRANSPORT SPOTS (jeep / trike / bus sakayan)
 # -------------------------------------------------------
 @app.get("/transport_spots")
-def transport_spots(
+async def transport_spots(
     origin: str = Query(..., description="origin address or 'lat,lng'"),
     destination: str = Query(..., description="destination address or 'lat,lng'"),
     radius_m: int = Query(1400, ge=200, le=3000),
     max_results: int = Query(6, ge=1, le=12),
 ):
     try:
-        spots = find_transport_spots(
+        spots = await find_transport_spots_async(
             origin=origin,
             destination=destination,
             radius_m=radius_m,
@@ -184,11 +266,38 @@ def transport_spots(
 # -------------------------------------------------------
 # DIRECTIONS / ROUTE
 # -------------------------------------------------------
+def _attach_geometry(route_obj: Dict[str, Any], fmt: str, zooms: Optional[str]) -> Optional[JSONResponse]:
+    """
+    Replace the per-step encoded polylines with one decoded-once, per-zoom
+    simplified geometry block; returns an error response for bad parameters.
+    """
+    try:
+        levels = [int(z) for z in zooms.split(",") if z.strip()] if zooms else list(DEFAULT_ZOOMS)
+    except ValueError:
+        levels = None
+    if fmt not in GEOMETRY_FORMATS or not levels or any(z < 0 or z > 22 for z in levels):
+        return JSONResponse(
+            status_code=400,
+            content={
+                "status": "error",
+                "code": "INVALID_INPUT",
+                "message": f"geometry must be one of {', '.join(GEOMETRY_FORMATS)} and zooms a list of 0-22.",
+            }
+        )
+
+    route_obj["geometry"] = route_geometry(route_obj, fmt=fmt, zooms=levels)
+    for step in route_obj.get("steps") or []:
+        step.pop("polyline", None)
+    return None
+
+
 @app.get("/route")
-def route(
+async def route(
     origin: str = Query(..., description="origin address or 'lat,lng'"),
     destination: str = Query(..., description="destination address or 'lat,lng'"),
-    mode: str = Query("walking", description="walking | driving | transit | bicycling")
+    mode: str = Query("walking", description="walking | driving | transit | bicycling"),
+    geometry: Optional[str] = Query(None, description="encoded | delta: add pre-simplified route geometry"),
+    zooms: Optional[str] = Query(None, description="comma-separated zoom levels for 'geometry', e.g. 12,14,16"),
 ):
     if not origin or not destination:
         return JSONResponse(
@@ -200,112 +309,37 @@ def route(
             }
         )
 
+    # overlap sakayan discovery with the Directions call when the route is clearly long
+    prefetch = _prefetch_transport_spots(origin, destination, mode)
+
     try:
-        route_obj = get_directions(origin, destination, mode=mode)
-    except Exception as e:
-        print("Internal get_directions error:", e)
+        route_obj = await fetch_route_async(origin, destination, mode=mode)
+    except DirectionsError as e:
+        if prefetch:
+            prefetch.cancel()
+        print("Directions failed:", e)
+        status_code, code, message = DIRECTIONS_ERRORS.get(e.code, DIRECTIONS_ERRORS["PARSE_FAILED"])
         return JSONResponse(
-            status_code=500,
+            status_code=status_code,
             content={
                 "status": "error",
-                "code": "INTERNAL_ROUTE_ERROR",
-                "message": "Internal routing engine failed."
+                "code": code,
+                "message": str(e) if e.code == "API_STATUS" else message,
             }
         )
 
-    if route_obj is None:
-        route_obj = None
-
-    if isinstance(route_obj, dict) and route_obj.get("steps"):
-        route_obj = _attach_transport_spots(route_obj, origin, destination, mode)
-        return {"status": "ok", "route": route_obj}
+    # session for /route/progress and spliced /reroute; created before 'geometry' strips the step polylines
+    route_obj["route_id"] = ROUTE_SESSIONS.create(route_obj)
 
-    GOOGLE_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
-    if not GOOGLE_KEY:
-        if route_obj:
-            return {"status": "ok", "route": route_obj}
-        return JSONResponse(
-            status_code=500,
-            content={
-                "status": "error",
-                "code": "NO_MAPS_KEY",
-                "message": "Missing GOOGLE_MAPS_API_KEY on server to fetch detailed directions."
-            }
-        )
+    if geometry:
+        geometry_error = _attach_geometry(route_obj, geometry, zooms)
+        if geometry_error:
+            if prefetch:
+                prefetch.cancel()
+            return geometry_error
 
-    try:
-        params = {
-            "origin": origin,
-            "destination": destination,
-            "key": GOOGLE_KEY,
-            "mode": mode,
-            "alternatives": "false",
-            "departure_time": "now"
-        }
-        resp = requests.get("https://maps.googleapis.com/maps/api/directions/json", params=params, timeout=15)
-        if resp.status_code != 200:
-            raise Exception(f"Google Directions HTTP {resp.status_code}: {resp.text}")
-
-        data = resp.json()
-        status = data.get("status", "")
-        if status != "OK":
-            if route_obj:
-                return {"status": "ok", "route": route_obj}
-            return JSONResponse(
-                status_code=400,
-                content={
-                    "status": "error",
-                    "code": "DIRECTIONS_API",
-                    "message": f"Google Directions returned {status}: {data.get('error_message')}"
-                }
-            )
-
-        route0 = data["routes"][0]
-        leg0 = route0["legs"][0]
-
-        steps_raw = leg0.get("steps", [])
-        steps = []
-        for s in steps_raw:
-            instr_html = s.get("html_instructions", "")
-            instr_text = _strip_html_tags(instr_html)
-            steps.append({
-                "instruction": instr_text,
-                "distance": s.get("distance"),
-                "duration": s.get("duration"),
-                "start_location": s.get("start_location"),
-                "end_location": s.get("end_location"),
-                "polyline": s.get("polyline", {}).get("points"),
-            })
-
-        overview_polyline = route0.get("overview_polyline", {}).get("points")
-        distance = leg0.get("distance")
-        duration = leg0.get("duration")
-
-        unified = route_obj if isinstance(route_obj, dict) else {}
-        unified.update({
-            "polyline": overview_polyline or unified.get("polyline"),
-            "distance": distance or unified.get("distance"),
-            "duration": duration or unified.get("duration"),
-            "steps": steps
-        })
-
-        unified = _attach_transport_spots(unified, origin, destination, mode)
-
-        return {"status": "ok", "route": unified}
-
-    except Exception as e:
-        print("Error fetching Google Directions:", e)
-        if route_obj:
-            route_obj = _attach_transport_spots(route_obj, origin, destination, mode)
-            return {"status": "ok", "route": route_obj}
-        return JSONResponse(
-            status_code=502,
-            content={
-                "status": "error",
-                "code": "DIRECTIONS_FETCH_FAILED",
-                "message": "Could not fetch directions from provider."
-            }
-        )
+    route_obj = await _attach_transport_spots(route_obj, origin, destination, mode, prefetch)
+    return {"status": "ok", "route": route_obj}
 
 
 # -------------------------------------------------------
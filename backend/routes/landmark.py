@@ -1,16 +1,59 @@
 # backend/routes/landmark.py
-from fastapi import APIRouter, Query
-import requests
+from fastapi import APIRouter, Query, HTTPException
+from pydantic import BaseModel
+import asyncio
 import os
-import time
-from typing import Any
+from typing import Any, List, Literal, Optional
+
+from utils.geo_cache import GridCache, haversine_m
+from utils.geometry import decode_polyline, resample
+from utils.maps_client import POI_STORE, PLACES_NEARBY_URL, _request_with_retries_async, remember_places
+from utils.route_session import ROUTE_SESSIONS
 
 router = APIRouter()
 
 GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
 
-CACHE = {}
 CACHE_TTL = 60 * 60  # 1 hour
+NEGATIVE_CACHE_TTL = 10 * 60  # empty corners are retried sooner
+
+# Callers within LANDMARK_REUSE_M of a cached lookup share its answer
+CACHE = GridCache(
+    cell_m=float(os.getenv("LANDMARK_REUSE_M", "30")),
+    reuse_radius_m=float(os.getenv("LANDMARK_REUSE_M", "30")),
+    max_entries=int(os.getenv("LANDMARK_CACHE_MAX_ENTRIES", "20000")),
+    ttl_s=CACHE_TTL,
+    negative_ttl_s=NEGATIVE_CACHE_TTL,
+)
+
+# Overall budget for one landmark lookup; slow Nearby Search calls are dropped
+LANDMARK_DEADLINE_S = float(os.getenv("LANDMARK_DEADLINE_S", "4.0"))
+
+SEARCH_RADIUS_M = 60
+WIDE_SEARCH_RADIUS_M = 120
+
+# "full" always runs every typed search; "adaptive" starts with the untyped search
+# and only escalates to typed searches when nothing scores above the threshold
+Strategy = Literal["full", "adaptive"]
+DEFAULT_STRATEGY: Strategy = "adaptive" if os.getenv("LANDMARK_STRATEGY") == "adaptive" else "full"
+ESCALATE_BELOW_SCORE = int(os.getenv("LANDMARK_ESCALATE_SCORE", "100"))
+
+# Per-strategy totals so Places spend can be compared
+UPSTREAM_STATS: dict[str, dict[str, int]] = {
+    "full": {"lookups": 0, "upstream_calls": 0},
+    "adaptive": {"lookups": 0, "upstream_calls": 0},
+}
+# Stored places (from anyone's searches) needed around a point to skip Places
+POI_MIN_RESULTS = int(os.getenv("LANDMARK_POI_MIN_RESULTS", "5"))
+
+BATCH_MAX_POINTS = 300
+# Lookups in flight at once for /landmark/batch; each one fans out to 10 searches
+BATCH_CONCURRENCY = int(os.getenv("LANDMARK_BATCH_CONCURRENCY", "4"))
+# A polyline is looked up every BATCH_SPACING_M along the line, not at every vertex
+BATCH_SPACING_M = float(os.getenv("LANDMARK_BATCH_SPACING_M", "100"))
+# Nearby Search calls one /landmark/batch request may spend; points left over
+# are answered from the caches only
+BATCH_MAX_UPSTREAM_CALLS = int(os.getenv("LANDMARK_BATCH_MAX_UPSTREAM_CALLS", "100"))
 
 # Block area-level names
 BAD_WORDS = [
@@ -131,8 +174,7 @@ def pick_best_landmark(results: list[dict[str, Any]]):
 
     return best_name
 
-def nearby_search(lat: float, lng: float, radius: int, place_type: str | None = None):
-    url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+async def nearby_search(lat: float, lng: float, radius: int, place_type: str | None = None) -> list[dict[str, Any]]:
     params = {
         "location": f"{lat},{lng}",
         "radius": radius,
@@ -140,48 +182,228 @@ def nearby_search(lat: float, lng: float, radius: int, place_type: str | None =
     }
     if place_type:
         params["type"] = place_type
-    return requests.get(url, params=params, timeout=6)
+
+    # coalesced with identical in-flight searches from other users at the same spot
+    data = await _request_with_retries_async(PLACES_NEARBY_URL, params, timeout=6, retries=0)
+    if data.get("status") != "OK":
+        return []
+    return data.get("results", [])
+
+async def gather_candidates(
+    lat: float,
+    lng: float,
+    radius: int,
+    place_types: Optional[list[Optional[str]]] = None,
+    timeout: float = LANDMARK_DEADLINE_S,
+) -> list[dict[str, Any]]:
+    """Run Nearby Search queries (typed then untyped by default) concurrently under one deadline."""
+    if place_types is None:
+        place_types = [*GOOD_TYPES, None]
+
+    tasks = [
+        asyncio.create_task(nearby_search(lat, lng, radius, place_type))
+        for place_type in place_types
+    ]
+    done, pending = await asyncio.wait(tasks, timeout=max(timeout, 0.0))
+    for task in pending:
+        task.cancel()
+
+    # Keep the original typed-then-untyped order so ties resolve as before
+    candidates: list[dict[str, Any]] = []
+    for task in tasks:
+        if task not in done or task.cancelled() or task.exception() is not None:
+            continue
+        candidates.extend(task.result())
+    return candidates
+
+def best_score(results: list[dict[str, Any]]) -> int:
+    return max((place_score(result) for result in results), default=-1)
+
+async def adaptive_candidates(lat: float, lng: float) -> tuple[list[dict[str, Any]], int, int]:
+    """
+    Untyped search first, widening the radius only when it comes back empty,
+    then typed searches only when the best untyped score is below the threshold.
+    Returns (candidates, upstream_calls, radius).
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + LANDMARK_DEADLINE_S
+
+    radius = SEARCH_RADIUS_M
+    calls = 1
+    candidates = await gather_candidates(lat, lng, radius, [None], deadline - loop.time())
+
+    if not candidates:
+        radius = WIDE_SEARCH_RADIUS_M
+        calls += 1
+        candidates = await gather_candidates(lat, lng, radius, [None], deadline - loop.time())
+
+    if best_score(candidates) < ESCALATE_BELOW_SCORE:
+        calls += len(GOOD_TYPES)
+        typed = await gather_candidates(lat, lng, radius, list(GOOD_TYPES), deadline - loop.time())
+        candidates = typed + candidates
+
+    return candidates, calls, radius
+
+def max_lookup_calls(strategy: Strategy) -> int:
+    """Most Nearby Search calls one uncached lookup can make."""
+    return len(GOOD_TYPES) + (2 if strategy == "adaptive" else 1)
+
+def cached_landmark(lat: float, lng: float) -> tuple[bool, Optional[str]]:
+    """(found, name) from the grid cache or the stored places alone, without calling Places."""
+    found, cached_name = CACHE.lookup(lat, lng)
+    if found:
+        return True, cached_name
+
+    # stored places are held to the same freshness as the landmark cache itself
+    stored = POI_STORE.query(lat, lng, SEARCH_RADIUS_M, family="landmark", min_results=POI_MIN_RESULTS,
+                             max_age_s=CACHE_TTL)
+    if stored is not None:
+        best_name = pick_best_landmark(stored)
+        CACHE.put(lat, lng, best_name)
+        return True, best_name
+    return False, None
+
+async def lookup_landmark(lat: float, lng: float, strategy: Strategy = DEFAULT_STRATEGY) -> tuple[Optional[str], int]:
+    """Resolve the best landmark name near a point through the grid cache. Returns (name, upstream_calls)."""
+    found, cached_name = cached_landmark(lat, lng)
+    if found:
+        return cached_name, 0
+
+    if strategy == "adaptive":
+        candidates, calls, radius = await adaptive_candidates(lat, lng)
+    else:
+        candidates = await gather_candidates(lat, lng, SEARCH_RADIUS_M)
+        calls = len(GOOD_TYPES) + 1
+        radius = SEARCH_RADIUS_M
+
+    UPSTREAM_STATS[strategy]["lookups"] += 1
+    UPSTREAM_STATS[strategy]["upstream_calls"] += calls
+    remember_places(candidates)
+    # searches that hit the deadline return nothing; only vouch for tiles that answered
+    if candidates:
+        POI_STORE.ingest(candidates, lat, lng, radius, family="landmark")
+
+    best_name = pick_best_landmark(candidates)
+    CACHE.put(lat, lng, best_name)
+    return best_name, calls
 
 @router.get("/landmark")
-def get_landmark(lat: float = Query(...), lng: float = Query(...)):
+async def get_landmark(
+    lat: float = Query(...),
+    lng: float = Query(...),
+    strategy: Strategy = Query(DEFAULT_STRATEGY),
+):
     if not GOOGLE_MAPS_API_KEY:
-        return {"name": None}
+        return {"name": None, "upstream_calls": 0}
 
-    key = f"{round(lat,5)},{round(lng,5)}"
-    now = time.time()
+    name, calls = await lookup_landmark(lat, lng, strategy)
+    return {"name": name, "upstream_calls": calls}
 
-    cached = CACHE.get(key)
-    if cached and now - cached["ts"] < CACHE_TTL:
-        return {"name": cached["name"]}
 
-    radius = 60
-    candidates: list[dict[str, Any]] = []
+class LandmarkPoint(BaseModel):
+    lat: float
+    lng: float
+
+
+class LandmarkBatchPayload(BaseModel):
+    # step coordinates, the route_id returned by /route or /reroute (one lookup
+    # per step), or an encoded polyline (one lookup every BATCH_SPACING_M)
+    steps: Optional[List[LandmarkPoint]] = None
+    route_id: Optional[str] = None
+    polyline: Optional[str] = None
+    strategy: Strategy = DEFAULT_STRATEGY
+
+
+def _search_centers(points: list[tuple[float, float]], merge_radius_m: float):
+    """
+    Greedily merge points whose search circles overlap into shared centers.
+    Returns (centers, assignment) where assignment[i] is the center index of points[i].
+    """
+    centers: list[tuple[float, float]] = []
+    assignment: list[int] = []
 
-    for t in GOOD_TYPES:
+    for lat, lng in points:
+        for idx, (c_lat, c_lng) in enumerate(centers):
+            if haversine_m(lat, lng, c_lat, c_lng) <= merge_radius_m:
+                assignment.append(idx)
+                break
+        else:
+            centers.append((lat, lng))
+            assignment.append(len(centers) - 1)
+
+    return centers, assignment
+
+@router.post("/landmark/batch")
+async def get_landmark_batch(payload: LandmarkBatchPayload):
+    """
+    Landmark names for a whole route. `index` is the step index for `steps`
+    and `route_id`; polyline samples also carry `distance_m` along the line.
+    At most BATCH_MAX_UPSTREAM_CALLS Nearby Search calls are spent, nearest
+    points first; points past that budget are answered from the caches only
+    and counted in `skipped`.
+    """
+    along = None
+    if payload.steps:
+        points = [(p.lat, p.lng) for p in payload.steps]
+    elif payload.route_id:
+        session = ROUTE_SESSIONS.get(payload.route_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="unknown or expired route_id")
+        points = [(float(step["lat"]), float(step["lng"])) for step in session.route["steps"]]
+    elif payload.polyline:
         try:
-            res = nearby_search(lat, lng, radius, t)
-            if res.status_code != 200:
-                continue
-            data = res.json()
-            if data.get("status") != "OK":
-                continue
-            candidates.extend(data.get("results", []))
+            samples, along = resample(decode_polyline(payload.polyline), BATCH_SPACING_M)
         except Exception:
-            continue
+            raise HTTPException(status_code=400, detail="invalid polyline")
+        points = [(float(lat), float(lng)) for lat, lng in samples]
+    else:
+        raise HTTPException(status_code=400, detail="provide 'steps', 'route_id' or 'polyline' in the payload")
 
-    try:
-        res = nearby_search(lat, lng, radius, None)
-        if res.status_code == 200:
-            data = res.json()
-            if data.get("status") == "OK":
-                candidates.extend(data.get("results", []))
-    except Exception:
-        pass
+    if len(points) > BATCH_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"too many points (max {BATCH_MAX_POINTS})")
 
-    best_name = pick_best_landmark(candidates)
-    if best_name:
-        CACHE[key] = {"name": best_name, "ts": now}
-        return {"name": best_name}
+    centers, assignment = _search_centers(points, CACHE.reuse_radius_m)
+    names: list[Optional[str]] = [None] * len(centers)
+    calls: list[int] = [0] * len(centers)
+    skipped = 0
+
+    if GOOGLE_MAPS_API_KEY:
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+        budget = BATCH_MAX_UPSTREAM_CALLS
+        reserve = max_lookup_calls(payload.strategy)
+
+        async def _resolve(idx: int, lat: float, lng: float):
+            nonlocal budget, skipped
+            found, names[idx] = cached_landmark(lat, lng)
+            if found:
+                return
+            async with semaphore:
+                # reserve the worst case before calling, refund what was not spent
+                if budget < reserve:
+                    skipped += 1
+                    return
+                budget -= reserve
+                names[idx], calls[idx] = await lookup_landmark(lat, lng, payload.strategy)
+                budget += reserve - calls[idx]
+
+        await asyncio.gather(*(_resolve(idx, lat, lng) for idx, (lat, lng) in enumerate(centers)))
+
+    landmarks = []
+    for i, (lat, lng) in enumerate(points):
+        landmark = {"index": i, "lat": lat, "lng": lng, "name": names[assignment[i]]}
+        if along is not None:
+            landmark["distance_m"] = round(float(along[i]), 1)
+        landmarks.append(landmark)
+
+    return {
+        "status": "ok",
+        "count": len(points),
+        "searches": len(centers),
+        "upstream_calls": sum(calls),
+        "skipped": skipped,
+        "landmarks": landmarks,
+    }
 
-    CACHE[key] = {"name": None, "ts": now}
-    return {"name": None}
+@router.get("/landmark/stats")
+async def landmark_cache_stats():
+    return {"status": "ok", "cache": CACHE.stats(), "upstream": UPSTREAM_STATS}
@@ -1,8 +1,12 @@
 # backend/routes/route.py
 from fastapi import APIRouter, HTTPException
-import requests
+from pydantic import BaseModel
 import os
-import re
+from typing import List, Optional, Tuple
+
+from utils.maps_client import DirectionsError, fetch_route_async
+from utils.route_match import match_fixes, polyline_line
+from utils.route_session import ROUTE_SESSIONS, RouteSession, rejoin_point, splice_route
 
 router = APIRouter()
 
@@ -12,78 +16,175 @@ if not GOOGLE_MAPS_API_KEY:
     raise RuntimeError("GOOGLE_MAPS_API_KEY is not set")
 
 
-def _strip_html(text: str) -> str:
-    """Remove HTML tags from Google instructions."""
-    return re.sub(r"<[^>]+>", "", text or "").strip()
+def _reroute_step(step: dict) -> dict:
+    return {
+        "instruction": step["instruction"],
+        "maneuver": step.get("maneuver"),
+        "lat": step["lat"],
+        "lng": step["lng"],
+        "distance_m": step["distance"]["value"],
+    }
+
+
+def _reroute_payload(route: dict, dest_lat: float, dest_lng: float, route_id: Optional[str] = None) -> dict:
+    """Project the shared normalized route model into the compact /reroute shape."""
+    return {
+        "polyline": route["polyline"],
+        "destination": {
+            "lat": dest_lat,
+            "lng": dest_lng,
+        },
+        "steps": [_reroute_step(step) for step in route["steps"]],
+        "distance_m": route["distance"]["value"],
+        "duration_s": route["duration"]["value"],
+        "mode": route["mode"],
+        "route_id": route_id,
+    }
+
+
+async def _splice_reroute(session: RouteSession, origin_lat: float, origin_lng: float) -> Optional[Tuple[dict, dict, int]]:
+    """
+    Short Directions request from the walker back to the nearest downstream step
+    of the session's route, spliced in; None whenever a full reroute is needed.
+    Returns (spliced route, rejoin point, number of detour steps).
+    """
+    rejoin = rejoin_point(session, origin_lat, origin_lng)
+    if rejoin is None:
+        return None
+
+    try:
+        detour = await fetch_route_async(
+            f"{origin_lat},{origin_lng}",
+            f"{rejoin['lat']},{rejoin['lng']}",
+            mode=session.route.get("mode") or "walking",
+            language=session.language,   # match the steps the client already has
+            region="PH",
+            timeout=10,
+        )
+    except DirectionsError as e:
+        print(f"[reroute] Splice detour failed, falling back to full reroute: {e}")
+        return None
+
+    spliced = splice_route(session.route, detour, rejoin)
+    if spliced is None:
+        return None
+    return spliced, rejoin, len(detour["steps"])
 
 
 @router.get("/reroute")
-def reroute(
+async def reroute(
     origin_lat: float,
     origin_lng: float,
     dest_lat: float,
     dest_lng: float,
     mode: str = "walking",
+    route_id: Optional[str] = None,
+    compact: bool = False,
 ):
     """
     Returns Google Directions JSON, localized for PH / Filipino usage.
     The mobile app will convert instructions to pure Tagalog.
+
+    With the route_id from /route (or a previous /reroute) only a short detour
+    back to the original route is requested and spliced in. compact=true then
+    returns just the detour steps plus the step index they replace up to.
     """
+    session = ROUTE_SESSIONS.get(route_id) if route_id else None
 
-    url = "https://maps.googleapis.com/maps/api/directions/json"
-    params = {
-        "origin": f"{origin_lat},{origin_lng}",
-        "destination": f"{dest_lat},{dest_lng}",
-        "mode": mode,                    # walking | driving
-        "language": "tl",                # 🇵🇭 Filipino / Tagalog
-        "region": "PH",                  # Philippines bias
-        "alternatives": "false",
-        "key": GOOGLE_MAPS_API_KEY,
-    }
+    if session is not None and session.same_trip(mode, dest_lat, dest_lng):
+        spliced = await _splice_reroute(session, origin_lat, origin_lng)
+        if spliced is not None:
+            route, rejoin, detour_steps = spliced
+            ROUTE_SESSIONS.replace(session, route)
+            payload = _reroute_payload(route, dest_lat, dest_lng, session.route_id)
+            payload["splice"] = {
+                "rejoin_step": rejoin["step_index"],   # index into the client's previous steps
+                "detour_steps": detour_steps,
+                "revision": session.revision,
+            }
+            if compact:
+                payload["steps"] = payload["steps"][:detour_steps]
+            return payload
 
+    # same pipeline (and cache) as /route, only localized
     try:
-        res = requests.get(url, params=params, timeout=10)
-        res.raise_for_status()
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Directions error: {e}")
-
-    data = res.json()
-
-    if data.get("status") != "OK":
-        raise HTTPException(
-            status_code=400,
-            detail=f"Directions failed: {data.get('status')}",
+        route = await fetch_route_async(
+            f"{origin_lat},{origin_lng}",
+            f"{dest_lat},{dest_lng}",
+            mode=mode,                   # walking | driving
+            language="tl",               # 🇵🇭 Filipino / Tagalog
+            region="PH",                 # Philippines bias
+            timeout=10,
         )
+    except DirectionsError as e:
+        if e.code == "FETCH_FAILED":
+            raise HTTPException(status_code=502, detail=f"Directions error: {e}")
+        if e.code == "API_STATUS":
+            raise HTTPException(status_code=400, detail=f"Directions failed: {e.status}")
+        raise HTTPException(status_code=500, detail=f"Failed to parse directions: {e}")
+
+    if session is not None:
+        ROUTE_SESSIONS.replace(session, route, language="tl")
+        route_id = session.route_id
+    else:
+        route_id = ROUTE_SESSIONS.create(route, language="tl")
 
     # 🔥 CLEAN INSTRUCTIONS FOR TAGALOG REWRITE
     try:
-        route = data["routes"][0]
-        leg = route["legs"][0]
-
-        steps = []
-        for s in leg["steps"]:
-            steps.append({
-                "instruction": _strip_html(s.get("html_instructions")),
-                "maneuver": s.get("maneuver"),
-                "lat": s["end_location"]["lat"],
-                "lng": s["end_location"]["lng"],
-                "distance_m": s["distance"]["value"],
-            })
-
-        return {
-            "polyline": route["overview_polyline"]["points"],
-            "destination": {
-                "lat": dest_lat,
-                "lng": dest_lng,
-            },
-            "steps": steps,
-            "distance_m": leg["distance"]["value"],
-            "duration_s": leg["duration"]["value"],
-            "mode": mode,
-        }
-
+        return _reroute_payload(route, dest_lat, dest_lng, route_id)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to parse directions: {e}",
         )
+
+
+# most recent fixes considered per progress check
+PROGRESS_MAX_FIXES = 50
+
+
+class GpsFix(BaseModel):
+    lat: float
+    lng: float
+    accuracy: Optional[float] = None   # meters, as reported by the device
+    heading: Optional[float] = None    # degrees from north; negative = unknown
+    timestamp: Optional[float] = None
+
+
+class RouteProgressPayload(BaseModel):
+    # the route_id returned by /route or /reroute, or the route's encoded polyline
+    route_id: Optional[str] = None
+    polyline: Optional[str] = None
+    fixes: List[GpsFix]
+
+
+@router.post("/route/progress")
+async def route_progress(payload: RouteProgressPayload):
+    """
+    Match recent GPS fixes (oldest first) against the active route; `status`
+    is on_route / off_route / unknown, alongside the current step. Clients
+    should only call /reroute once this says off_route.
+    """
+    if not payload.fixes:
+        raise HTTPException(status_code=400, detail="provide at least one fix")
+    if not payload.route_id and not payload.polyline:
+        raise HTTPException(status_code=400, detail="provide either 'route_id' or 'polyline' in the payload")
+
+    if payload.route_id:
+        session = ROUTE_SESSIONS.get(payload.route_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="unknown or expired route_id")
+        line = session.line
+    else:
+        try:
+            line = polyline_line(payload.polyline)
+        except Exception:
+            raise HTTPException(status_code=400, detail="invalid polyline")
+
+    fixes = [
+        {"lat": f.lat, "lng": f.lng, "accuracy": f.accuracy, "heading": f.heading, "timestamp": f.timestamp}
+        for f in payload.fixes[-PROGRESS_MAX_FIXES:]
+    ]
+    if all(f["timestamp"] is not None for f in fixes):
+        fixes.sort(key=lambda f: f["timestamp"])
+    return match_fixes(line, fixes)
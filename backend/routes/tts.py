@@ -1,34 +1,309 @@
 # backend/routes/tts.py
-import hashlib
+import asyncio
+import json
 import os
-from typing import Optional, Literal
+import re
+from typing import AsyncIterator, Dict, List, Optional, Literal, Tuple
 
-from fastapi import APIRouter, Query, HTTPException
-from fastapi.responses import FileResponse
+import httpx
+from fastapi import APIRouter, Query, HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from pydantic import BaseModel
 
-from services.tts_service import generate_tts_audio_bytes
+from services.tts_cache import TTS_CACHE, TTS_HOT_CACHE, tts_cache_key
+from services.tts_segments import TTS_SEGMENTED, assemble_tts_audio, split_segments
+from services.tts_service import generate_tts_audio_bytes, open_tts_audio_stream
+from utils.single_flight import SingleFlight
 from utils.tts_format import prepare_tts_text, normalize_voice
 
 router = APIRouter()
 
 Style = Literal["calm", "warning"]
 MAX_TEXT_LENGTH = 500
-TTS_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "cache", "tts")
-os.makedirs(TTS_CACHE_DIR, exist_ok=True)
+TTS_ROUTE_MAX_INSTRUCTIONS = int(os.getenv("TTS_ROUTE_MAX_INSTRUCTIONS", "200"))
+TTS_ROUTE_CONCURRENCY = int(os.getenv("TTS_ROUTE_CONCURRENCY", "4"))  # per /tts/route request
 
+# one synthesis per cache key at a time; later requests await the first
+TTS_SINGLE_FLIGHT = SingleFlight()
+# cache key -> the upstream stream shared by concurrent stream=true misses
+_TTS_STREAMS: Dict[str, "_AudioBroadcast"] = {}
 
-def _tts_cache_key(text: str, lang: str, voice: str) -> str:
-    """Build a stable cache key for deterministic TTS inputs."""
-    joined = f"{lang}|{voice}|{text}"
-    return hashlib.sha256(joined.encode("utf-8")).hexdigest()
+_CACHE_KEY_RE = re.compile(r"^[0-9a-f]{64}$")
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
 
 
-def _tts_cache_path(cache_key: str) -> str:
-    """Resolve the on-disk cache file path for a key."""
-    return os.path.join(TTS_CACHE_DIR, f"{cache_key}.mp3")
+def _etag(cache_key: str) -> str:
+    return f'"{cache_key}"'
+
+
+def _audio_headers(cache_key: str, cache_status: str) -> Dict[str, str]:
+    return {
+        "Cache-Control": "private, max-age=86400",
+        "ETag": _etag(cache_key),
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": "inline; filename=tts.mp3",
+        "X-TTS-Cache": cache_status,
+    }
+
+
+def _not_modified(request: Request, cache_key: str) -> bool:
+    """
+    True when If-None-Match names this clip (weak comparison; audio for a key
+    never changes meaning). Only call it for a clip that exists: "*" matches
+    any current representation.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag.strip('"') == cache_key:
+            return True
+    return False
+
+
+def _byte_range(request: Request, cache_key: str, size: int):
+    """
+    (start, end) inclusive for a satisfiable single Range request, None to
+    send the whole clip, or False when the range cannot be satisfied.
+    """
+    header = request.headers.get("range")
+    if not header:
+        return None
+    if_range = request.headers.get("if-range")
+    # strong comparison only: a weak W/"..." tag or a date never matches
+    if if_range and if_range.strip() != _etag(cache_key):
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None  # multiple or malformed ranges: whole clip
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _bytes_response(request: Request, data: bytes, headers: Dict[str, str], cache_key: str) -> Response:
+    size = len(data)
+    byte_range = _byte_range(request, cache_key, size)
+    if byte_range is False:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}", "ETag": _etag(cache_key)})
+    if byte_range is None:
+        return Response(data, media_type="audio/mpeg", headers=headers)
+    start, end = byte_range
+    return Response(
+        data[start:end + 1],
+        status_code=206,
+        media_type="audio/mpeg",
+        headers={**headers, "Content-Range": f"bytes {start}-{end}/{size}"},
+    )
+
+
+def _cached_audio_response(request: Request, cache_key: str) -> Optional[Response]:
+    """
+    Serve a cached clip from the in-memory hot tier or the disk cache
+    (FileResponse handles Range there), or 304 for a matching If-None-Match.
+    None on a miss, before any conditional header is considered.
+    """
+    data = TTS_HOT_CACHE.get(cache_key)
+    cache_path = None
+    if data is None:
+        cache_path = TTS_CACHE.lookup(cache_key)
+        if not cache_path:
+            return None
+
+    if _not_modified(request, cache_key):
+        return Response(status_code=304, headers={
+            "ETag": _etag(cache_key),
+            "Cache-Control": "private, max-age=86400",
+        })
+
+    if data is None:
+        data = TTS_HOT_CACHE.offer(cache_key, cache_path)
+        if data is None:
+            return FileResponse(
+                cache_path,
+                media_type="audio/mpeg",
+                filename="tts.mp3",
+                headers={**_audio_headers(cache_key, "HIT"), "X-TTS-Tier": "disk"},
+            )
+    else:
+        TTS_CACHE.record_hit(cache_key)
+
+    return _bytes_response(request, data, {**_audio_headers(cache_key, "HIT"), "X-TTS-Tier": "memory"}, cache_key)
+
+
+async def _synthesize_to_cache(final_text: str, lang: str, voice: str, cache_key: str,
+                               segmented: Optional[bool] = None) -> Tuple[str, Optional[str]]:
+    """
+    Synthesize prepared text into the cache entry for cache_key, assembling
+    it from phrase fragments when enabled. Returns the cache path and the
+    X-TTS-Segments header value (None for whole-line synthesis).
+
+    Concurrent misses for one key share a single synthesis: in-process via
+    TTS_SINGLE_FLIGHT (or an in-flight stream=true broadcast), across workers
+    via the cache's synthesis lock, after which the entry is re-checked
+    before paying for it again.
+    """
+
+    async def _synthesize() -> Tuple[str, Optional[str]]:
+        broadcast = _TTS_STREAMS.get(cache_key)
+        if broadcast is not None:
+            # a stream=true request is already synthesizing this key
+            await broadcast.finished.wait()
+            if broadcast.error is not None:
+                raise broadcast.error
+            return TTS_CACHE.path(cache_key), None
+        async with TTS_CACHE.synthesis_lock(cache_key):
+            cache_path = TTS_CACHE.path(cache_key)
+            if os.path.exists(cache_path):
+                return cache_path, None  # another worker finished it while we waited
+            return await _synthesize_uncoalesced(final_text, lang, voice, cache_key, segmented)
+
+    return await TTS_SINGLE_FLIGHT.do(cache_key, _synthesize)
+
+
+async def _synthesize_uncoalesced(final_text: str, lang: str, voice: str, cache_key: str,
+                                  segmented: Optional[bool]) -> Tuple[str, Optional[str]]:
+    audio_bytes = None
+    segment_header = None
+    use_segments = TTS_SEGMENTED if segmented is None else segmented
+    if use_segments and len(split_segments(final_text)) > 1:
+        try:
+            audio_bytes, seg_stats = await assemble_tts_audio(final_text, lang, voice)
+            segment_header = f"{seg_stats['segments']};synthesized={seg_stats['synthesized']}"
+        except ValueError as e:
+            print("TTS SEGMENT ASSEMBLY FAILED, synthesizing whole:", e)
+
+    if audio_bytes is None:
+        audio_bytes = await generate_tts_audio_bytes(
+            text=final_text,
+            voice=voice,
+        )
+
+    if not audio_bytes:
+        raise ValueError("TTS returned no audio")
+
+    return TTS_CACHE.write(cache_key, audio_bytes), segment_header
+
+
+async def _tee_to_cache(upstream: httpx.Response, cache_key: str) -> AsyncIterator[bytes]:
+    """
+    Forward upstream audio chunks as they arrive while writing them to a
+    private temp file, which only becomes the cache entry once the whole
+    stream has been received. Aborted or failed streams leave no cache file.
+    """
+    tmp_path = TTS_CACHE.tmp_path(cache_key)
+    try:
+        with open(tmp_path, "wb") as f:
+            async for chunk in upstream.aiter_bytes():
+                if not chunk:
+                    continue
+                f.write(chunk)
+                yield chunk
+        if os.path.getsize(tmp_path) > 0:
+            TTS_CACHE.commit(cache_key, tmp_path)
+    except Exception as e:
+        print("TTS STREAM ERROR:", e)
+        raise
+    finally:
+        await upstream.aclose()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class _AudioBroadcast:
+    """
+    One upstream TTS stream shared by every concurrent stream=true miss for a
+    cache key. A background task reads it through _tee_to_cache (under the
+    cross-worker synthesis lock) into memory; each client replays the chunks
+    received so far and then follows live ones, so a client disconnecting
+    never cuts the stream short for the others or leaves the cache empty.
+    """
+
+    def __init__(self, cache_key: str):
+        self.cache_key = cache_key
+        self.chunks: List[bytes] = []
+        self.error: Optional[Exception] = None
+        self.opened = asyncio.Event()  # upstream answered (or failed)
+        self.finished = asyncio.Event()
+        self._changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def _publish(self, chunk: Optional[bytes] = None) -> None:
+        if chunk:
+            self.chunks.append(chunk)
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def run(self, final_text: str, voice: str) -> None:
+        try:
+            async with TTS_CACHE.synthesis_lock(self.cache_key):
+                cache_path = TTS_CACHE.path(self.cache_key)
+                if os.path.exists(cache_path):
+                    # another worker finished it while we waited
+                    self.opened.set()
+                    with open(cache_path, "rb") as f:
+                        self._publish(f.read())
+                    return
+                upstream = await open_tts_audio_stream(text=final_text, voice=voice)
+                self.opened.set()
+                async for chunk in _tee_to_cache(upstream, self.cache_key):
+                    self._publish(chunk)
+        except Exception as e:
+            self.error = e
+        finally:
+            if _TTS_STREAMS.get(self.cache_key) is self:
+                del _TTS_STREAMS[self.cache_key]
+            self.opened.set()
+            self.finished.set()
+            self._publish()
+
+    async def follow(self) -> AsyncIterator[bytes]:
+        index = 0
+        while True:
+            changed = self._changed
+            while index < len(self.chunks):
+                yield self.chunks[index]
+                index += 1
+            if self.finished.is_set():
+                if self.error is not None:
+                    raise self.error  # truncated: the client must not keep a partial clip
+                return
+            await changed.wait()
+
+
+def _join_stream(cache_key: str, final_text: str, voice: str) -> _AudioBroadcast:
+    broadcast = _TTS_STREAMS.get(cache_key)
+    if broadcast is None:
+        broadcast = _AudioBroadcast(cache_key)
+        _TTS_STREAMS[cache_key] = broadcast
+        broadcast.task = asyncio.create_task(broadcast.run(final_text, voice))
+    return broadcast
+
+
+@router.get("/tts/cache/stats")
+async def tts_cache_stats():
+    return {
+        "status": "ok",
+        "cache": TTS_CACHE.stats(),
+        "hot": TTS_HOT_CACHE.stats(),
+        "single_flight": TTS_SINGLE_FLIGHT.stats(),
+        "streams_in_flight": len(_TTS_STREAMS),
+    }
 
 @router.get("/tts")
 async def tts(
+    request: Request,
     text: str = Query(...),
     lang: str = Query("fil"),                 # ✅ default Tagalog
     voice: Optional[str] = Query(None),       # ✅ default handled in normalize_voice()
@@ -36,6 +311,8 @@ async def tts(
     style: Style = Query("calm"),
     pause_ms: Optional[int] = Query(None),
     emphasis: Optional[str] = Query(None),
+    stream: bool = Query(False),              # forward audio as it is synthesized
+    segmented: Optional[bool] = Query(None),  # join cached phrase fragments (default: TTS_SEGMENTED)
 ):
     try:
         stripped_text = text.strip()
@@ -52,49 +329,160 @@ async def tts(
             emphasis=emphasis,
         )
         final_voice = normalize_voice(voice, gender)
-        cache_key = _tts_cache_key(final_text, lang, final_voice)
-        cache_path = _tts_cache_path(cache_key)
+        cache_key = tts_cache_key(final_text, lang, final_voice)
+        cached = _cached_audio_response(request, cache_key)
+        if cached is not None:
+            return cached
 
-        if os.path.exists(cache_path):
-            return FileResponse(
-                cache_path,
+        # stream misses share one upstream stream per key; if a non-stream
+        # synthesis of the key is already running, wait for it below instead
+        if stream and (cache_key in _TTS_STREAMS or not TTS_SINGLE_FLIGHT.in_flight(cache_key)):
+            broadcast = _join_stream(cache_key, final_text, final_voice)
+            await broadcast.opened.wait()
+            if broadcast.error is not None and not broadcast.chunks:
+                raise broadcast.error
+            return StreamingResponse(
+                broadcast.follow(),
                 media_type="audio/mpeg",
-                filename="tts.mp3",
                 headers={
                     "Cache-Control": "private, max-age=86400",
-                    "ETag": cache_key,
-                    "Accept-Ranges": "bytes",
+                    "ETag": _etag(cache_key),
                     "Content-Disposition": "inline; filename=tts.mp3",
-                    "X-TTS-Cache": "HIT",
+                    "X-TTS-Cache": "MISS",
+                    "X-TTS-Stream": "1",
                 },
             )
 
-        audio_bytes = await generate_tts_audio_bytes(
-            text=final_text,
-            voice=final_voice,
+        cache_path, segment_header = await _synthesize_to_cache(
+            final_text, lang, final_voice, cache_key, segmented
         )
 
-        if not audio_bytes:
-            raise ValueError("TTS returned no audio")
-
-        tmp_path = f"{cache_path}.tmp"
-        with open(tmp_path, "wb") as f:
-            f.write(audio_bytes)
-        os.replace(tmp_path, cache_path)
+        headers = _audio_headers(cache_key, "MISS")
+        if segment_header:
+            headers["X-TTS-Segments"] = segment_header
 
         return FileResponse(
             cache_path,
             media_type="audio/mpeg",
             filename="tts.mp3",
-            headers={
-                "Cache-Control": "private, max-age=86400",
-                "ETag": cache_key,
-                "Accept-Ranges": "bytes",
-                "Content-Disposition": "inline; filename=tts.mp3",
-                "X-TTS-Cache": "MISS",
-            },
+            headers=headers,
         )
 
     except Exception as e:
         print("TTS ERROR:", e)
         raise HTTPException(status_code=500, detail=str(e))
+
+
+class RouteTTSPayload(BaseModel):
+    instructions: List[str]  # exactly the lines the app will speak, e.g. "Sa 60 metro, lumiko pakaliwa."
+    lang: str = "fil"
+    voice: Optional[str] = None
+    gender: Optional[str] = None
+    style: Style = "calm"
+    pause_ms: Optional[int] = None
+    emphasis: Optional[str] = None
+    segmented: Optional[bool] = None
+
+
+async def _route_manifest(
+    entries: List[Tuple[int, str, str]], lang: str, voice: str, segmented: Optional[bool]
+) -> AsyncIterator[bytes]:
+    """
+    NDJSON manifest: one line per instruction as soon as its audio is in the
+    cache (hits first), then a summary line. Identical lines are synthesized
+    once. A client that disconnects cancels the synthesis still queued.
+    """
+    by_key: Dict[str, List[int]] = {}
+    texts: Dict[str, str] = {}
+    for index, final_text, cache_key in entries:
+        by_key.setdefault(cache_key, []).append(index)
+        texts[cache_key] = final_text
+
+    def _lines(cache_key: str, **fields) -> bytes:
+        return b"".join(
+            json.dumps({"index": index, "key": cache_key, **fields}).encode("utf-8") + b"\n"
+            for index in by_key[cache_key]
+        )
+
+    summary = {"done": True, "instructions": len(entries), "unique": len(by_key), "hits": 0, "synthesized": 0, "failed": 0}
+    missing = []
+    for cache_key in by_key:
+        if TTS_CACHE.lookup(cache_key):
+            summary["hits"] += 1
+            yield _lines(cache_key, url=f"/tts/clip/{cache_key}", cache="HIT")
+        else:
+            missing.append(cache_key)
+
+    semaphore = asyncio.Semaphore(max(1, TTS_ROUTE_CONCURRENCY))
+
+    async def _synthesize(cache_key: str) -> Tuple[str, Optional[Exception]]:
+        async with semaphore:
+            try:
+                await _synthesize_to_cache(texts[cache_key], lang, voice, cache_key, segmented)
+                return cache_key, None
+            except Exception as e:
+                return cache_key, e
+
+    tasks = [asyncio.create_task(_synthesize(cache_key)) for cache_key in missing]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            cache_key, error = await finished
+            if error is None:
+                summary["synthesized"] += 1
+                yield _lines(cache_key, url=f"/tts/clip/{cache_key}", cache="MISS")
+            else:
+                print("TTS ROUTE ERROR:", error)
+                summary["failed"] += 1
+                yield _lines(cache_key, error=str(error))
+        yield json.dumps(summary).encode("utf-8") + b"\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@router.post("/tts/route")
+async def tts_route(payload: RouteTTSPayload):
+    """
+    Pre-synthesize every spoken instruction of a route, streaming an NDJSON
+    manifest. Send the text exactly as the app will later pass it to GET /tts
+    (Tagalog lead-ins included), so the cache keys match.
+    """
+    instructions = payload.instructions
+    if not instructions:
+        raise HTTPException(status_code=400, detail="instructions is required")
+    if len(instructions) > TTS_ROUTE_MAX_INSTRUCTIONS:
+        raise HTTPException(status_code=400, detail=f"too many instructions (max {TTS_ROUTE_MAX_INSTRUCTIONS})")
+
+    final_voice = normalize_voice(payload.voice, payload.gender)
+    entries = []
+    for index, text in enumerate(instructions):
+        stripped_text = (text or "").strip()
+        if not stripped_text:
+            continue
+        if len(stripped_text) > MAX_TEXT_LENGTH:
+            raise HTTPException(status_code=400, detail=f"instruction {index} too long (max {MAX_TEXT_LENGTH} chars)")
+        final_text, _, _ = prepare_tts_text(
+            text=stripped_text,
+            lang=payload.lang,
+            style=payload.style,
+            pause_ms=payload.pause_ms,
+            emphasis=payload.emphasis,
+        )
+        entries.append((index, final_text, tts_cache_key(final_text, payload.lang, final_voice)))
+
+    return StreamingResponse(
+        _route_manifest(entries, payload.lang, final_voice, payload.segmented),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+@router.get("/tts/clip/{cache_key}")
+async def tts_clip(cache_key: str, request: Request):
+    """Cached audio by key, as listed in a /tts/route manifest."""
+    if not _CACHE_KEY_RE.match(cache_key):
+        raise HTTPException(status_code=400, detail="invalid cache key")
+    cached = _cached_audio_response(request, cache_key)
+    if cached is None:
+        raise HTTPException(status_code=404, detail="clip not cached")
+    return cached
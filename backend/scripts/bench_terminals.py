@@ -0,0 +1,98 @@
+# backend/scripts/bench_terminals.py
+"""
+Compare local terminal-index lookups with the Google Places path.
+
+    cd backend
+    python -m scripts.bench_terminals                    # index from TRANSPORT_TERMINALS_PATH
+    python -m scripts.bench_terminals --synthetic 5000   # random terminals around Metro Manila
+    python -m scripts.bench_terminals --places 5         # also time 5 live Places lookups
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from typing import List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.terminal_index import TERMINAL_KINDS, TerminalIndex, load_terminal_index  # noqa: E402
+
+# Metro Manila bounding box
+LAT_RANGE = (14.40, 14.78)
+LNG_RANGE = (120.90, 121.13)
+
+
+def _random_point(rng: random.Random):
+    return rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)
+
+
+def _synthetic_index(count: int, rng: random.Random) -> TerminalIndex:
+    terminals = []
+    for i in range(count):
+        lat, lng = _random_point(rng)
+        terminals.append({
+            "place_id": f"local:{i}", "kind": rng.choice(TERMINAL_KINDS),
+            "name": None, "address": None, "lat": lat, "lng": lng, "source": "local",
+        })
+    return TerminalIndex(terminals)
+
+
+def _time_us(fn, points) -> float:
+    start = time.perf_counter()
+    for lat, lng in points:
+        fn(lat, lng)
+    return (time.perf_counter() - start) / len(points) * 1e6
+
+
+async def _time_places(points, destinations) -> Tuple[float, float]:
+    """(us per query, Nearby Search calls per query) for origin -> destination lookups via Places."""
+    import utils.maps_client as maps_client
+
+    maps_client.TERMINAL_INDEX = TerminalIndex([])  # force the Places path
+    calls_before = maps_client.MAPS_SINGLE_FLIGHT.leaders
+    start = time.perf_counter()
+    for (lat, lng), (dest_lat, dest_lng) in zip(points, destinations):
+        maps_client.TRANSPORT_CACHE.clear()
+        await maps_client.find_transport_spots_async(f"{lat},{lng}", f"{dest_lat},{dest_lng}", radius_m=1400)
+    elapsed = time.perf_counter() - start
+    calls = maps_client.MAPS_SINGLE_FLIGHT.leaders - calls_before
+    return elapsed / len(points) * 1e6, calls / len(points)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the local transport terminal index.")
+    parser.add_argument("--synthetic", type=int, default=0, help="build a random index of N terminals instead")
+    parser.add_argument("--queries", type=int, default=10000)
+    parser.add_argument("--radius", type=float, default=1400.0)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--places", type=int, default=0, help="also time N live Places lookups (needs API key)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    index = _synthetic_index(args.synthetic, rng) if args.synthetic else load_terminal_index()
+    if not len(index):
+        print("Index is empty; pass --synthetic N or set TRANSPORT_TERMINALS_PATH.")
+        return 1
+
+    points = [_random_point(rng) for _ in range(args.queries)]
+    print(f"index: {index.stats()}")
+    for kind in TERMINAL_KINDS:
+        within = _time_us(lambda lat, lng: index.within(kind, lat, lng, args.radius), points)
+        nearest = _time_us(lambda lat, lng: index.nearest(kind, lat, lng, args.k), points)
+        print(f"{kind:>5}: within({args.radius:.0f} m) {within:8.1f} us/query   nearest(k={args.k}) {nearest:8.1f} us/query")
+
+    if args.places:
+        # a distinct destination per origin, as a real route has
+        destinations = [_random_point(rng) for _ in range(args.places)]
+        places, calls = asyncio.run(_time_places(points[: args.places], destinations))
+        print(f"places: find_transport_spots_async {places:10.1f} us/query "
+              f"({calls:.1f} Nearby Search calls/query, transport cache cleared)")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,136 @@
+# backend/scripts/import_terminals.py
+"""
+Import jeepney / tricycle / bus terminals into the normalized CSV read by
+utils.terminal_index.
+
+    cd backend
+    python -m scripts.import_terminals export.geojson survey.csv --out data/transport_terminals.csv
+
+Inputs may be GeoJSON (e.g. an Overpass/OSM export) or CSV with at least
+lat, lng and either a `kind` column or a name/tags that identify the kind.
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+from typing import Any, Dict, Iterator, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.geo_cache import haversine_m  # noqa: E402
+from utils.terminal_index import CSV_FIELDS, TERMINAL_KINDS, TERMINALS_PATH, read_terminals  # noqa: E402
+
+# terminals of the same kind closer than this are treated as one
+DEDUPE_RADIUS_M = 15.0
+
+
+def _classify(props: Dict[str, Any]) -> Optional[str]:
+    """Infer jeep / trike / bus from an explicit kind or from OSM-style tags and the name."""
+    kind = str(props.get("kind") or "").strip().lower()
+    if kind in TERMINAL_KINDS:
+        return kind
+
+    text = " ".join(
+        str(props.get(key) or "")
+        for key in ("name", "route", "description", "operator", "network")
+    ).lower()
+    # word boundaries, so "Business Center" is not a bus terminal
+    if re.search(r"\b(?:tricycle|trike|toda)\b", text):
+        return "trike"
+    if re.search(r"\bjeep", text) or props.get("route") == "share_taxi":
+        return "jeep"
+    if props.get("amenity") == "bus_station" or props.get("highway") == "bus_stop" or re.search(r"\bbus\b", text):
+        return "bus"
+    return None
+
+
+def _point(geometry: Dict[str, Any]) -> Optional[List[float]]:
+    """Point coordinates, or the centroid of a polygon's outer ring for station areas."""
+    kind = geometry.get("type")
+    coords = geometry.get("coordinates")
+    if kind == "Point":
+        return coords[:2]
+    if kind == "Polygon" and coords and coords[0]:
+        ring = coords[0]
+        return [sum(p[0] for p in ring) / len(ring), sum(p[1] for p in ring) / len(ring)]
+    return None
+
+
+def _read_features(path: str) -> Iterator[Dict[str, Any]]:
+    if path.lower().endswith((".geojson", ".json")):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for feature in data.get("features", []):
+            point = _point(feature.get("geometry") or {})
+            if point is None:
+                continue
+            props = dict(feature.get("properties") or {})
+            props.setdefault("id", feature.get("id") or props.get("@id"))
+            yield {**props, "lng": point[0], "lat": point[1]}
+    else:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            yield from csv.DictReader(f)
+
+
+def import_terminals(paths: List[str], existing: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = [
+        {field: row.get("place_id" if field == "id" else field) for field in CSV_FIELDS} for row in existing
+    ]
+
+    for path in paths:
+        for props in _read_features(path):
+            kind = _classify(props)
+            try:
+                lat = float(props["lat"])
+                lng = float(props["lng"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if kind is None:
+                continue
+
+            if any(
+                row["kind"] == kind and haversine_m(lat, lng, float(row["lat"]), float(row["lng"])) < DEDUPE_RADIUS_M
+                for row in rows
+            ):
+                continue
+
+            raw_id = props.get("id")
+            rows.append({
+                "id": f"osm:{raw_id}" if raw_id and not str(raw_id).startswith(("osm:", "local:")) else raw_id,
+                "kind": kind,
+                "name": props.get("name") or "",
+                "address": props.get("address") or props.get("addr:street") or "",
+                "lat": f"{lat:.7f}",
+                "lng": f"{lng:.7f}",
+            })
+
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Import transport terminals into the local index file.")
+    parser.add_argument("inputs", nargs="+", help="GeoJSON or CSV files to import")
+    parser.add_argument("--out", default=TERMINALS_PATH, help="normalized CSV to write")
+    parser.add_argument("--merge", action="store_true", help="keep terminals already in --out")
+    args = parser.parse_args(argv)
+
+    existing = read_terminals(args.out) if args.merge and os.path.exists(args.out) else []
+    rows = import_terminals(args.inputs, existing)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    tmp_path = f"{args.out}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp_path, args.out)
+
+    counts = {kind: sum(1 for row in rows if row["kind"] == kind) for kind in TERMINAL_KINDS}
+    print(f"Wrote {len(rows)} terminals to {args.out}: {counts}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,71 @@
+# backend/scripts/warm_tts.py
+"""
+Pre-synthesize common navigation phrases into the /tts cache.
+
+    cd backend
+    python -m scripts.warm_tts --dry-run                 # show what is missing and what it would cost
+    python -m scripts.warm_tts --max-chars 5000          # synthesize within a character budget
+    python -m scripts.warm_tts --styles calm --distances 30,60,100
+"""
+import argparse
+import asyncio
+import os
+import sys
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv()
+
+from services.tts_segments import TTS_SEGMENTED  # noqa: E402
+from services.tts_warmup import (  # noqa: E402
+    WARMUP_CONCURRENCY,
+    WARMUP_DISTANCES_M,
+    WARMUP_MAX_CHARS,
+    WARMUP_MAX_REQUESTS,
+    WARMUP_STYLES,
+    warm_tts_cache,
+    warmup_phrases,
+    warmup_plan,
+)
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Warm the TTS cache with navigation phrases.")
+    parser.add_argument("--distances", type=_int_list, default=list(WARMUP_DISTANCES_M))
+    parser.add_argument("--styles", default=",".join(WARMUP_STYLES), help="comma-separated: calm,warning")
+    parser.add_argument("--voices", default=None, help="comma-separated OpenAI voices (default: VOICE_BY_GENDER)")
+    parser.add_argument("--max-requests", type=int, default=WARMUP_MAX_REQUESTS)
+    parser.add_argument("--max-chars", type=int, default=WARMUP_MAX_CHARS)
+    parser.add_argument("--concurrency", type=int, default=WARMUP_CONCURRENCY)
+    parser.add_argument("--whole", action="store_true", help="warm whole lines even when TTS_SEGMENTED=1")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be synthesized")
+    args = parser.parse_args(argv)
+
+    plan = warmup_plan(
+        warmup_phrases(args.distances),
+        voices=args.voices.split(",") if args.voices else None,
+        styles=[style.strip() for style in args.styles.split(",") if style.strip()],
+        segments=TTS_SEGMENTED and not args.whole,
+    )
+    stats = asyncio.run(warm_tts_cache(
+        plan,
+        max_requests=args.max_requests,
+        max_chars=args.max_chars,
+        concurrency=args.concurrency,
+        dry_run=args.dry_run,
+    ))
+
+    for name, value in stats.items():
+        print(f"{name:>12}: {value}")
+    return 1 if stats["aborted"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
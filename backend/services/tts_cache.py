@@ -0,0 +1,419 @@
+# backend/services/tts_cache.py
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process synthesis lock
+    fcntl = None
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR") or os.path.join(os.path.dirname(os.path.dirname(__file__)), "cache", "tts")
+TTS_CACHE_MAX_BYTES = int(float(os.getenv("TTS_CACHE_MAX_MB", "512")) * 1024 * 1024)
+TTS_CACHE_POLICY = (os.getenv("TTS_CACHE_POLICY") or "lru").lower()  # lru | lfu
+TTS_CACHE_SWEEP_INTERVAL_S = float(os.getenv("TTS_CACHE_SWEEP_INTERVAL_S", "300"))
+
+# Eviction goes down to this fraction of the budget so it does not run on every write
+TTS_CACHE_LOW_WATER = 0.9
+# Entries read this recently are never evicted: a FileResponse may still be sending them
+TTS_CACHE_MIN_IDLE_S = 60
+# Temp files older than this belong to a crashed or abandoned write
+TTS_CACHE_STALE_TMP_S = 60 * 60
+# How long a worker waits for another worker's synthesis of the same key before doing it itself
+TTS_CACHE_LOCK_TIMEOUT_S = float(os.getenv("TTS_CACHE_LOCK_TIMEOUT_S", "30"))
+TTS_CACHE_LOCK_POLL_S = 0.05
+
+# In-memory tier in front of the disk cache for the most requested clips
+TTS_HOT_CACHE_MAX_BYTES = int(float(os.getenv("TTS_HOT_CACHE_MAX_MB", "32")) * 1024 * 1024)
+TTS_HOT_CACHE_MAX_CLIP_BYTES = int(os.getenv("TTS_HOT_CACHE_MAX_CLIP_KB", "256")) * 1024
+# Disk hits a clip needs before it is held in memory, so one-off lines do not churn the tier
+TTS_HOT_CACHE_ADMIT_HITS = int(os.getenv("TTS_HOT_CACHE_ADMIT_HITS", "2"))
+TTS_HOT_CACHE_MAX_TRACKED = 10000  # keys whose disk hits are counted toward admission
+
+CACHE_SUFFIX = ".mp3"
+
+
+def tts_cache_key(text: str, lang: str, voice: str) -> str:
+    """Build a stable cache key for deterministic TTS inputs."""
+    joined = f"{lang}|{voice}|{text}"
+    return hashlib.sha256(joined.encode("utf-8")).hexdigest()
+
+
+class TTSDiskCache:
+    """
+    Synthesized MP3s on disk, one file per cache key, with a SQLite access
+    index (size, last access, hit count) that drives LRU or LFU eviction once
+    the directory outgrows `max_bytes`. A background sweeper reconciles the
+    index with the directory and removes abandoned temp files.
+    """
+
+    def __init__(self, directory: str = TTS_CACHE_DIR, max_bytes: int = TTS_CACHE_MAX_BYTES,
+                 policy: str = TTS_CACHE_POLICY, sweep_interval_s: float = TTS_CACHE_SWEEP_INTERVAL_S):
+        if policy not in ("lru", "lfu"):
+            raise ValueError(f"unknown TTS cache policy: {policy!r}")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.sweep_interval_s = sweep_interval_s
+        self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self.last_sweep: Optional[float] = None
+        # hits served from memory, folded into the index before eviction decisions
+        self._pending_hits: Dict[str, Tuple[float, int]] = {}
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock_dir = os.path.join(directory, "locks")
+        os.makedirs(self._lock_dir, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, "index.sqlite3"), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " bytes INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+
+    def path(self, key: str) -> str:
+        """Resolve the on-disk cache file path for a key."""
+        return os.path.join(self.directory, f"{key}{CACHE_SUFFIX}")
+
+    def tmp_path(self, key: str) -> str:
+        """A private temp file next to the entry, so the final rename is atomic."""
+        return f"{self.path(key)}.{uuid.uuid4().hex}.tmp"
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Path of the cached MP3 for `key` (recording the access), or None on a miss."""
+        self._ensure_sweeper()
+        path = self.path(key)
+        now = time.time()
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = None
+
+        with self._lock:
+            if size is None:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "INSERT INTO entries (key, bytes, created_at, accessed_at, hits) VALUES (?, ?, ?, ?, 1)"
+                " ON CONFLICT(key) DO UPDATE SET accessed_at = excluded.accessed_at, hits = hits + 1",
+                (key, size, now, now),
+            )
+            self.hits += 1
+        return path
+
+    def _try_lock(self, lock_path: str) -> Optional[int]:
+        """fd holding an exclusive flock on lock_path, or None if another holder has it."""
+        while True:
+            fd = os.open(lock_path, os.O_CREAT | os.O_RDWR, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return None
+            try:
+                if os.fstat(fd).st_ino == os.stat(lock_path).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            # the previous holder unlinked the file after we opened it: lock the new one
+            os.close(fd)
+
+    @asynccontextmanager
+    async def synthesis_lock(self, key: str, timeout_s: float = TTS_CACHE_LOCK_TIMEOUT_S) -> AsyncIterator[bool]:
+        """
+        Advisory lock across worker processes for synthesizing `key`; yields
+        whether it was acquired. On timeout the caller proceeds unlocked,
+        since a duplicate synthesis beats a stalled request. Each key has its
+        own lock file, removed by the holder on release, so holding one key's
+        lock never blocks another key (e.g. a line and its fragments).
+        """
+        if fcntl is None:
+            yield False
+            return
+        lock_path = os.path.join(self._lock_dir, f"{key}.lock")
+        deadline = time.monotonic() + timeout_s
+        fd = self._try_lock(lock_path)
+        while fd is None:
+            if time.monotonic() >= deadline:
+                print(f"[tts_cache] Lock wait for {key} timed out")
+                break
+            await asyncio.sleep(TTS_CACHE_LOCK_POLL_S)
+            fd = self._try_lock(lock_path)
+
+        try:
+            yield fd is not None
+        finally:
+            if fd is not None:
+                try:
+                    os.unlink(lock_path)
+                except FileNotFoundError:
+                    pass
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+
+    def record_hit(self, key: str) -> None:
+        """Count a hit served without touching disk (e.g. from the hot tier)."""
+        with self._lock:
+            _, count = self._pending_hits.get(key, (0.0, 0))
+            self._pending_hits[key] = (time.time(), count + 1)
+            self.hits += 1
+
+    def _flush_hits_locked(self) -> None:
+        if not self._pending_hits:
+            return
+        self._conn.executemany(
+            "UPDATE entries SET accessed_at = MAX(accessed_at, ?), hits = hits + ? WHERE key = ?",
+            [(ts, count, key) for key, (ts, count) in self._pending_hits.items()],
+        )
+        self._pending_hits.clear()
+
+    def commit(self, key: str, tmp_path: str) -> str:
+        """Atomically publish a fully written temp file as the entry for `key`."""
+        path = self.path(key)
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, bytes, created_at, accessed_at, hits) VALUES (?, ?, ?, ?, 0)",
+                (key, size, now, now),
+            )
+            victims = self._eviction_victims_locked()
+        self._remove_victims(victims)
+        return path
+
+    def write(self, key: str, data: bytes) -> str:
+        """Store `data` for `key` and return the entry's path."""
+        tmp_path = self.tmp_path(key)
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            return self.commit(key, tmp_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _total_bytes_locked(self) -> int:
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM entries").fetchone()
+        return total
+
+    def _eviction_victims_locked(self) -> List[Tuple[str, int]]:
+        """
+        Once over budget, pick entries (least recently / least frequently used
+        first) down to the low-water mark and drop them from the index. Their
+        files are removed by _remove_victims after the lock is released.
+        """
+        self._flush_hits_locked()
+        total = self._total_bytes_locked()
+        if total <= self.max_bytes:
+            return []
+        target_bytes = int(self.max_bytes * TTS_CACHE_LOW_WATER)
+
+        order = "hits ASC, accessed_at ASC" if self.policy == "lfu" else "accessed_at ASC"
+        rows = self._conn.execute(
+            f"SELECT key, bytes FROM entries WHERE accessed_at < ? ORDER BY {order}",
+            (time.time() - TTS_CACHE_MIN_IDLE_S,),
+        ).fetchall()
+
+        victims = []
+        for key, size in rows:
+            if total <= target_bytes:
+                break
+            victims.append((key, size))
+            total -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in victims])
+        return victims
+
+    def _remove_victims(self, victims: List[Tuple[str, int]]) -> int:
+        """Delete the files of entries _eviction_victims_locked picked; returns how many went."""
+        evicted = 0
+        evicted_bytes = 0
+        for key, size in victims:
+            path = self.path(key)
+            try:
+                if time.time() - os.path.getmtime(path) < TTS_CACHE_MIN_IDLE_S:
+                    continue  # rewritten since it was picked; the sweeper re-indexes it
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"[tts_cache] Could not evict {key}: {e}")
+                continue
+            evicted += 1
+            evicted_bytes += size
+        with self._lock:
+            self.evictions += evicted
+            self.evicted_bytes += evicted_bytes
+        return evicted
+
+    def sweep(self) -> Dict[str, int]:
+        """Reconcile index and directory, drop abandoned temp files, and enforce the byte budget."""
+        now = time.time()
+        on_disk: Dict[str, int] = {}
+        removed_tmp = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if name.endswith(".tmp"):
+                    if now - os.path.getmtime(path) > TTS_CACHE_STALE_TMP_S:
+                        os.remove(path)
+                        removed_tmp += 1
+                elif name.endswith(CACHE_SUFFIX):
+                    on_disk[name[: -len(CACHE_SUFFIX)]] = os.path.getsize(path)
+            except OSError:
+                continue
+
+        with self._lock:
+            self._flush_hits_locked()
+            indexed = {key for (key,) in self._conn.execute("SELECT key FROM entries")}
+            missing = indexed - set(on_disk)
+            untracked = set(on_disk) - indexed
+            self._conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in missing])
+            # files from before the index existed (or another process) count as old, unused entries
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO entries (key, bytes, created_at, accessed_at, hits) VALUES (?, ?, 0, 0, 0)",
+                [(key, on_disk[key]) for key in untracked],
+            )
+            victims = self._eviction_victims_locked()
+            self.last_sweep = now
+        evicted = self._remove_victims(victims)
+
+        return {"removed_tmp": removed_tmp, "dropped": len(missing), "adopted": len(untracked), "evicted": evicted}
+
+    def _sweep_loop(self) -> None:
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"[tts_cache] Sweep failed: {e}")
+            time.sleep(self.sweep_interval_s)
+
+    def _ensure_sweeper(self) -> None:
+        if self._sweeper is not None or self.sweep_interval_s <= 0:
+            return
+        with self._lock:
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(target=self._sweep_loop, name="tts-cache-sweeper", daemon=True)
+                self._sweeper.start()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM entries").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "policy": self.policy,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "evicted_bytes": self.evicted_bytes,
+            "last_sweep": self.last_sweep,
+        }
+
+
+class TTSHotCache:
+    """
+    Byte-bounded LRU of clip bytes in front of TTSDiskCache. A clip is only
+    admitted after TTS_HOT_CACHE_ADMIT_HITS disk hits, so memory goes to
+    repeat phrases ("Magpatuloy.", "Malapit na.") rather than one-off lines.
+    """
+
+    def __init__(self, max_bytes: int = TTS_HOT_CACHE_MAX_BYTES, max_clip_bytes: int = TTS_HOT_CACHE_MAX_CLIP_BYTES,
+                 admit_hits: int = TTS_HOT_CACHE_ADMIT_HITS):
+        self.max_bytes = max_bytes
+        self.max_clip_bytes = max_clip_bytes
+        self.admit_hits = admit_hits
+        self._clips: "OrderedDict[str, bytes]" = OrderedDict()
+        self._disk_hits: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.admitted = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._clips.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._clips.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def offer(self, key: str, path: str) -> Optional[bytes]:
+        """Note a disk hit for `key`; load and keep the clip once it is hot enough. Returns the bytes if held."""
+        if self.max_bytes <= 0:
+            return None
+        with self._lock:
+            count = self._disk_hits.pop(key, 0) + 1
+            if count < self.admit_hits:
+                self._disk_hits[key] = count
+                while len(self._disk_hits) > TTS_HOT_CACHE_MAX_TRACKED:
+                    self._disk_hits.popitem(last=False)
+                return None
+
+        try:
+            if os.path.getsize(path) > self.max_clip_bytes:
+                return None
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        self.put(key, data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_clip_bytes:
+            return
+        with self._lock:
+            old = self._clips.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            else:
+                self.admitted += 1
+            self._clips[key] = data
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes and self._clips:
+                _, evicted = self._clips.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "clips": len(self._clips),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "admitted": self.admitted,
+            "evictions": self.evictions,
+        }
+
+
+TTS_CACHE = TTSDiskCache()
+TTS_HOT_CACHE = TTSHotCache()
@@ -0,0 +1,104 @@
+# backend/services/tts_segments.py
+import asyncio
+import os
+import re
+from typing import Any, Dict, List, Tuple
+
+from services.tts_cache import TTS_CACHE, tts_cache_key
+from services.tts_service import generate_tts_audio_bytes
+from utils.mp3 import concat_mp3, mp3_frames
+from utils.single_flight import SingleFlight
+
+# Opt-in: assemble /tts audio from cached fragments instead of synthesizing
+# whole lines. Joins are not prosody- or padding-matched: check the joined
+# audio before enabling it.
+TTS_SEGMENTED = os.getenv("TTS_SEGMENTED", "0") == "1"
+TTS_SEGMENT_CONCURRENCY = int(os.getenv("TTS_SEGMENT_CONCURRENCY", "4"))
+
+SEGMENT_SINGLE_FLIGHT = SingleFlight()
+
+# Fragments end only at clause punctuation ("Makinig.", "Sa 100 metro,"), where
+# a spoken pause already falls; a clause itself is never cut
+_CLAUSE_BREAK = re.compile(r"(?<=[.,;:!?])\s+")
+
+
+def split_segments(text: str) -> List[str]:
+    """
+    Split prepared TTS text into reusable fragments:
+    "Makinig. Sa 100 metro, lumiko pakanan papunta sa Rizal Avenue."
+    -> ["Makinig.", "Sa 100 metro,", "lumiko pakanan papunta sa Rizal Avenue."]
+    """
+    return [clause for clause in _CLAUSE_BREAK.split(text.strip()) if clause]
+
+
+def segment_key(fragment: str, lang: str, voice: str) -> str:
+    """Cache key of a fragment; kept apart from whole-line keys of the same text."""
+    return tts_cache_key(fragment, lang, f"{voice}|segment")
+
+
+def _read_file(path: str):
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None  # missing, or evicted between lookup and read
+
+
+def _read_segment(key: str):
+    path = TTS_CACHE.lookup(key)
+    return _read_file(path) if path else None
+
+
+async def synthesize_segment(fragment: str, lang: str, voice: str) -> bytes:
+    """
+    Synthesize one fragment and cache its bare frames (no ID3/Xing header).
+    Concurrent calls for a fragment share one synthesis, in this process via
+    single-flight and across workers via the cache's synthesis lock.
+    """
+    key = segment_key(fragment, lang, voice)
+
+    async def _synthesize() -> bytes:
+        async with TTS_CACHE.synthesis_lock(key):
+            done = _read_file(TTS_CACHE.path(key))
+            if done:
+                return done  # another worker cached it while we waited
+            audio = await generate_tts_audio_bytes(text=fragment, voice=voice)
+            if not audio:
+                raise ValueError("TTS returned no audio")
+            frames, _ = mp3_frames(audio)
+            TTS_CACHE.write(key, frames)
+            return frames
+
+    return await SEGMENT_SINGLE_FLIGHT.do(key, _synthesize)
+
+
+async def assemble_tts_audio(text: str, lang: str, voice: str) -> Tuple[bytes, Dict[str, Any]]:
+    """
+    MP3 for prepared `text` joined from per-fragment audio, synthesizing only
+    fragments not cached yet. Raises ValueError when fragments cannot be
+    joined (e.g. mismatched sample rates), so callers can synthesize whole.
+    """
+    fragments = split_segments(text)
+    keys = [segment_key(fragment, lang, voice) for fragment in fragments]
+
+    audio: Dict[str, bytes] = {}
+    missing: Dict[str, str] = {}
+    for fragment, key in zip(fragments, keys):
+        if key in audio or key in missing:
+            continue
+        data = _read_segment(key)
+        if data:
+            audio[key] = data
+        else:
+            missing[key] = fragment
+
+    semaphore = asyncio.Semaphore(max(1, TTS_SEGMENT_CONCURRENCY))
+
+    async def _synthesize(key: str, fragment: str) -> None:
+        async with semaphore:
+            audio[key] = await synthesize_segment(fragment, lang, voice)
+
+    await asyncio.gather(*(_synthesize(key, fragment) for key, fragment in missing.items()))
+
+    joined = concat_mp3([audio[key] for key in keys])
+    return joined, {"segments": len(fragments), "synthesized": len(missing)}
@@ -18,11 +18,8 @@ def _get_tts_http_client() -> httpx.AsyncClient:
         )
     return _TTS_HTTP_CLIENT
 
-async def generate_tts_audio_bytes(
-    text: str,
-    voice: Optional[str] = "alloy",
-    model: str = "tts-1",
-) -> bytes:
+def _speech_request(text: str, voice: Optional[str], model: str):
+    """Return (url, headers, payload) for an OpenAI speech request."""
     if not OPENAI_API_KEY:
         raise RuntimeError("OPENAI_API_KEY is not configured in environment")
 
@@ -38,6 +35,15 @@ async def generate_tts_audio_bytes(
         "input": text,
         "voice": voice or "alloy",
     }
+    return url, headers, payload
+
+
+async def generate_tts_audio_bytes(
+    text: str,
+    voice: Optional[str] = "alloy",
+    model: str = "tts-1",
+) -> bytes:
+    url, headers, payload = _speech_request(text, voice, model)
 
     client = _get_tts_http_client()
     resp = await client.post(url, headers=headers, json=payload)
@@ -51,6 +57,36 @@ async def generate_tts_audio_bytes(
 
     return resp.content
 
+
+async def open_tts_audio_stream(
+    text: str,
+    voice: Optional[str] = "alloy",
+    model: str = "tts-1",
+) -> httpx.Response:
+    """
+    Start a streamed synthesis and return the response once OpenAI has accepted
+    it, so errors still surface before any audio is sent. The caller iterates
+    `aiter_bytes()` and must `aclose()` the response.
+    """
+    url, headers, payload = _speech_request(text, voice, model)
+
+    client = _get_tts_http_client()
+    request = client.build_request("POST", url, headers=headers, json=payload)
+    resp = await client.send(request, stream=True)
+
+    if resp.status_code != 200:
+        try:
+            await resp.aread()
+            try:
+                detail = resp.json()
+            except Exception:
+                detail = resp.text
+        finally:
+            await resp.aclose()
+        raise Exception(f"OpenAI TTS error: HTTP {resp.status_code} - {detail}")
+
+    return resp
+
 # Backwards compatible alias
 async def generate_tts_audio(text: str, voice: Optional[str] = "alloy", model: str = "tts-1") -> bytes:
     return await generate_tts_audio_bytes(text=text, voice=voice, model=model)
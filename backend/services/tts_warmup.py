@@ -0,0 +1,149 @@
+# backend/services/tts_warmup.py
+import asyncio
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from routes.tts import _synthesize_to_cache
+from services.tts_cache import TTS_CACHE, tts_cache_key
+from services.tts_segments import TTS_SEGMENTED, segment_key, split_segments, synthesize_segment
+from utils.tagalog_nav import ACTION_TRANSLATIONS, tagalog_distance_phrase
+from utils.tts_format import VOICE_BY_GENDER, prepare_tts_text
+
+# Distances whose lead-ins are pre-rendered through tagalog_distance_phrase
+# ("Malapit na." under 15 m, "Sa 60 metro," above); the app announces inside 120 m
+WARMUP_DISTANCES_M = tuple(int(d) for d in os.getenv("TTS_WARMUP_DISTANCES", "10,20,30,40,50,60,80,100,120").split(","))
+WARMUP_STYLES = ("calm", "warning")
+WARMUP_LANG = "fil"
+# What the app sends with every /tts request
+WARMUP_PAUSE_MS = 280
+WARMUP_EMPHASIS = "medium"
+
+# Spend caps for one run: OpenAI bills speech per input character
+WARMUP_MAX_REQUESTS = int(os.getenv("TTS_WARMUP_MAX_REQUESTS", "300"))
+WARMUP_MAX_CHARS = int(os.getenv("TTS_WARMUP_MAX_CHARS", "20000"))
+WARMUP_CONCURRENCY = int(os.getenv("TTS_WARMUP_CONCURRENCY", "3"))
+# Give up after this many failures in a row (bad key, quota): the rest would fail too
+WARMUP_MAX_CONSECUTIVE_FAILURES = 5
+
+# Fixed lines the app speaks outside step guidance
+EXTRA_PHRASES = (
+    "Sandali lang, inaayos ko ulit ang daan.",
+)
+
+
+def warmup_phrases(distances: Sequence[int] = WARMUP_DISTANCES_M) -> List[str]:
+    """Raw guidance lines as the app sends them, most frequently spoken first."""
+    actions = list(ACTION_TRANSLATIONS.values())
+    sentences = [action[:1].upper() + action[1:] for action in actions]
+    phrases = sentences + list(EXTRA_PHRASES)
+    # nearest first: short distances are announced on every step
+    lead_ins = dict.fromkeys(tagalog_distance_phrase(meters) for meters in sorted(distances))
+    for lead_in in lead_ins:
+        # "Malapit na." is a sentence of its own; "Sa 60 metro," runs into the action
+        following = sentences if lead_in.endswith(".") else actions
+        phrases.extend(f"{lead_in} {action}" for action in following)
+    return phrases
+
+
+def warmup_plan(
+    phrases: Optional[Iterable[str]] = None,
+    voices: Optional[Sequence[str]] = None,
+    styles: Sequence[str] = WARMUP_STYLES,
+    segments: bool = TTS_SEGMENTED,
+) -> List[Dict[str, Any]]:
+    """
+    Every (phrase, style, voice) rendered through prepare_tts_text with the
+    pause and emphasis the app sends, keyed exactly like GET /tts. Ordered
+    style-major then voice so a spend cap cuts the rarest combinations.
+    With `segments`, the plan holds the distinct fragments /tts assembles
+    lines from rather than the lines themselves.
+    """
+    phrases = list(phrases if phrases is not None else warmup_phrases())
+    voices = list(voices or VOICE_BY_GENDER.values())
+
+    plan: List[Dict[str, Any]] = []
+    seen = set()
+    for style in styles:
+        for voice in voices:
+            for phrase in phrases:
+                final_text, _, _ = prepare_tts_text(
+                    text=phrase,
+                    lang=WARMUP_LANG,
+                    style=style,
+                    pause_ms=WARMUP_PAUSE_MS,
+                    emphasis=WARMUP_EMPHASIS,
+                )
+                fragments = split_segments(final_text) if segments else [final_text]
+                for text in fragments:
+                    segment = len(fragments) > 1
+                    key = segment_key(text, WARMUP_LANG, voice) if segment else tts_cache_key(text, WARMUP_LANG, voice)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    plan.append({"key": key, "text": text, "voice": voice, "style": style, "segment": segment})
+    return plan
+
+
+async def warm_tts_cache(
+    plan: Optional[List[Dict[str, Any]]] = None,
+    max_requests: int = WARMUP_MAX_REQUESTS,
+    max_chars: int = WARMUP_MAX_CHARS,
+    concurrency: int = WARMUP_CONCURRENCY,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """
+    Synthesize the plan's missing entries into the /tts cache within the spend
+    caps. Entries go through the same single-flight and synthesis lock as /tts
+    misses, so several workers warming at startup (or a live request for the
+    same line) pay for each entry once.
+    """
+    plan = warmup_plan() if plan is None else plan
+    missing = [item for item in plan if not os.path.exists(TTS_CACHE.path(item["key"]))]
+
+    selected = []
+    chars = 0
+    for item in missing:
+        if len(selected) >= max_requests or chars + len(item["text"]) > max_chars:
+            break
+        selected.append(item)
+        chars += len(item["text"])
+
+    stats: Dict[str, Any] = {
+        "planned": len(plan),
+        "cached": len(plan) - len(missing),
+        "selected": len(selected),
+        "over_budget": len(missing) - len(selected),
+        "chars": chars,
+        "synthesized": 0,
+        "failed": 0,
+        "aborted": False,
+    }
+    if dry_run or not selected:
+        return stats
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    consecutive_failures = 0
+
+    async def _synthesize(item: Dict[str, Any]) -> None:
+        nonlocal consecutive_failures
+        async with semaphore:
+            if stats["aborted"]:
+                return
+            try:
+                if item["segment"]:
+                    await synthesize_segment(item["text"], WARMUP_LANG, item["voice"])
+                else:
+                    await _synthesize_to_cache(item["text"], WARMUP_LANG, item["voice"], item["key"], segmented=False)
+            except Exception as e:
+                stats["failed"] += 1
+                consecutive_failures += 1
+                print(f"[tts_warmup] {item['text']!r} ({item['voice']}) failed: {e}")
+                if consecutive_failures >= WARMUP_MAX_CONSECUTIVE_FAILURES:
+                    stats["aborted"] = True
+                return
+            consecutive_failures = 0
+            stats["synthesized"] += 1
+
+    await asyncio.gather(*(_synthesize(item) for item in selected))
+    print(f"[tts_warmup] {stats}")
+    return stats
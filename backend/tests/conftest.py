@@ -0,0 +1,14 @@
+# backend/tests/conftest.py
+import os
+import sys
+import tempfile
+
+# Isolate every on-disk cache and satisfy the key checks done at import time;
+# this must run before any backend module is imported.
+_TMP = tempfile.mkdtemp(prefix="navi-tests-")
+os.environ["TTS_CACHE_DIR"] = os.path.join(_TMP, "tts")
+os.environ["MAPS_CACHE_DB"] = os.path.join(_TMP, "maps.sqlite3")
+os.environ.setdefault("GOOGLE_MAPS_API_KEY", "test-key")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
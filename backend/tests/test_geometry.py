@@ -0,0 +1,53 @@
+# backend/tests/test_geometry.py
+import numpy as np
+
+from utils.geometry import decode_polyline, delta_encode, encode_polyline, resample, simplify, to_e5
+
+# Google's reference example from the Encoded Polyline Algorithm Format docs
+GOOGLE_EXAMPLE = "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+GOOGLE_POINTS = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+
+
+def test_decode_matches_reference():
+    np.testing.assert_allclose(decode_polyline(GOOGLE_EXAMPLE), GOOGLE_POINTS)
+
+
+def test_encode_matches_reference():
+    assert encode_polyline(GOOGLE_POINTS) == GOOGLE_EXAMPLE
+
+
+def test_round_trip_is_exact_at_1e5():
+    rng = np.random.default_rng(7)
+    # Manila-area walk plus values around chunk boundaries (2**5k / 1e5 degrees)
+    points = np.cumsum(rng.normal(0, 0.0004, size=(500, 2)), axis=0) + (14.6, 120.98)
+    edges = np.array([[0.0, 0.0], [0.00031, -0.00032], [0.01023, 0.01024], [-0.32767, 0.32768], [89.99999, -179.99999]])
+    for pts in (points, edges):
+        decoded = decode_polyline(encode_polyline(pts))
+        np.testing.assert_array_equal(to_e5(decoded), to_e5(pts))
+
+
+def test_empty_polyline():
+    assert encode_polyline([]) == ""
+    assert decode_polyline("").shape == (0, 2)
+
+
+def test_delta_encode_reconstructs_points():
+    deltas = np.array(delta_encode(GOOGLE_POINTS)).reshape(-1, 2)
+    np.testing.assert_array_equal(np.cumsum(deltas, axis=0), to_e5(GOOGLE_POINTS))
+
+
+def test_simplify_keeps_endpoints_and_drops_collinear_points():
+    line = [(14.6, 120.98 + i * 0.0001) for i in range(20)]
+    assert simplify(line, 1.0).tolist() == [list(line[0]), list(line[-1])]
+
+
+def test_resample_spacing_and_endpoints():
+    # ~1.1 km due north, with an extra vertex mid-way
+    points = [(14.6, 120.98), (14.605, 120.98), (14.61, 120.98)]
+    samples, along = resample(points, 100.0)
+
+    assert len(samples) == 13
+    np.testing.assert_allclose(samples[0], points[0])
+    np.testing.assert_allclose(samples[-1], points[-1])
+    np.testing.assert_allclose(np.diff(along[:-1]), 100.0)
+    assert along[-1] - along[-2] <= 100.0
@@ -0,0 +1,43 @@
+# backend/tests/test_landmark_batch.py
+import asyncio
+
+import routes.landmark as landmark
+from utils.geometry import encode_polyline
+
+
+def _fake_nearby(calls):
+    async def nearby_search(lat, lng, radius, place_type=None):
+        calls.append((lat, lng, place_type))
+        return [{"name": "Jollibee Espana", "types": ["restaurant"], "place_id": f"p{len(calls)}"}]
+    return nearby_search
+
+
+def test_polyline_is_resampled_not_looked_up_per_vertex(monkeypatch):
+    calls = []
+    monkeypatch.setattr(landmark, "nearby_search", _fake_nearby(calls))
+    landmark.CACHE.clear()
+
+    # ~550 m north with a vertex every ~5.5 m
+    line = [(14.5 + i * 0.00005, 121.02) for i in range(101)]
+    payload = landmark.LandmarkBatchPayload(polyline=encode_polyline(line), strategy="full")
+    result = asyncio.run(landmark.get_landmark_batch(payload))
+
+    assert result["count"] == 7  # every 100 m plus the end
+    assert [p["distance_m"] for p in result["landmarks"][:3]] == [0.0, 100.0, 200.0]
+    assert result["landmarks"][0]["name"] == "Jollibee Espana"
+    assert result["upstream_calls"] == len(calls) == result["searches"] * landmark.max_lookup_calls("full")
+
+
+def test_upstream_budget_caps_one_request(monkeypatch):
+    calls = []
+    monkeypatch.setattr(landmark, "nearby_search", _fake_nearby(calls))
+    monkeypatch.setattr(landmark, "BATCH_MAX_UPSTREAM_CALLS", 25)
+    landmark.CACHE.clear()
+
+    steps = [landmark.LandmarkPoint(lat=14.4, lng=121.0 + i * 0.01) for i in range(5)]
+    payload = landmark.LandmarkBatchPayload(steps=steps, strategy="full")
+    result = asyncio.run(landmark.get_landmark_batch(payload))
+
+    assert len(calls) == result["upstream_calls"] == 20
+    assert result["skipped"] == 3
+    assert [p["name"] is not None for p in result["landmarks"]] == [True, True, False, False, False]
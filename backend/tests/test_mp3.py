@@ -0,0 +1,92 @@
+# backend/tests/test_mp3.py
+import asyncio
+
+import pytest
+
+import services.tts_segments as tts_segments
+from routes import tts as tts_routes
+from services.tts_cache import TTS_CACHE, tts_cache_key
+from utils.mp3 import concat_mp3, mp3_frames
+
+# MPEG-2 Layer III, 48 kbps, 24 kHz mono: 144-byte frames, 9 bytes of side info
+FRAME_24K = b"\xff\xf3\x64\xc4" + b"\x01" * 140
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz mono: 417-byte frames
+FRAME_44K = b"\xff\xfb\x90\xc4" + b"\x02" * 413
+
+ID3V2 = b"ID3\x04\x00\x00\x00\x00\x00\x0a" + b"\x00" * 10  # 10-byte header + 10-byte body
+ID3V1 = b"TAG" + b"\x00" * 125
+
+
+def _header_frame(tag: bytes, offset: int) -> bytes:
+    frame = bytearray(FRAME_24K)
+    frame[offset:offset + 4] = tag
+    return bytes(frame)
+
+
+def test_id3_tags_are_stripped():
+    frames, fmt = mp3_frames(ID3V2 + FRAME_24K * 3 + ID3V1)
+    assert frames == FRAME_24K * 3
+    assert fmt == (2, 24000, 1)
+
+
+@pytest.mark.parametrize("tag, offset", [(b"Xing", 13), (b"Info", 13), (b"VBRI", 36)])
+def test_vbr_header_frame_is_dropped(tag, offset):
+    frames, _ = mp3_frames(ID3V2 + _header_frame(tag, offset) + FRAME_24K * 2)
+    assert frames == FRAME_24K * 2
+
+
+def test_truncated_last_frame_is_dropped():
+    frames, _ = mp3_frames(FRAME_24K * 2 + FRAME_24K[:60])
+    assert frames == FRAME_24K * 2
+
+
+def test_no_frames_and_format_changes_raise():
+    with pytest.raises(ValueError):
+        mp3_frames(ID3V2 + b"not audio")
+    with pytest.raises(ValueError):
+        mp3_frames(FRAME_24K + FRAME_44K)
+    with pytest.raises(ValueError):
+        concat_mp3([FRAME_24K, FRAME_44K])
+    assert concat_mp3([ID3V2 + FRAME_24K, _header_frame(b"Xing", 13) + FRAME_24K * 2]) == FRAME_24K * 3
+
+
+def test_mismatched_fragments_fall_back_to_whole_line(monkeypatch):
+    text = "Malapit na. Lumiko sa kaliwa sa tulay."
+    fragment_audio = {"Malapit na.": FRAME_24K * 2, "Lumiko sa kaliwa sa tulay.": FRAME_44K * 2}
+    whole_calls = []
+
+    async def fragment_tts(text, voice):
+        return fragment_audio[text]
+
+    async def whole_tts(text, voice):
+        whole_calls.append(text)
+        return FRAME_24K * 5
+
+    monkeypatch.setattr(tts_segments, "generate_tts_audio_bytes", fragment_tts)
+    monkeypatch.setattr(tts_routes, "generate_tts_audio_bytes", whole_tts)
+
+    key = tts_cache_key(text, "fil", "alloy")
+    path, segment_header = asyncio.run(tts_routes._synthesize_to_cache(text, "fil", "alloy", key, segmented=True))
+
+    assert whole_calls == [text] and segment_header is None
+    with open(path, "rb") as f:
+        assert f.read() == FRAME_24K * 5
+    assert TTS_CACHE.lookup(key) == path
+
+
+def test_matching_fragments_are_joined_and_reused(monkeypatch):
+    calls = []
+
+    async def fragment_tts(text, voice):
+        calls.append(text)
+        return ID3V2 + _header_frame(b"Xing", 13) + FRAME_24K * 2
+
+    monkeypatch.setattr(tts_segments, "generate_tts_audio_bytes", fragment_tts)
+
+    audio, stats = asyncio.run(tts_segments.assemble_tts_audio("Makinig. Dumiretso sa kanto.", "fil", "alloy"))
+    assert audio == FRAME_24K * 4
+    assert stats == {"segments": 2, "synthesized": 2}
+
+    _, stats = asyncio.run(tts_segments.assemble_tts_audio("Makinig. Tumawid sa kanto.", "fil", "alloy"))
+    assert stats == {"segments": 2, "synthesized": 1}
+    assert calls == ["Makinig.", "Dumiretso sa kanto.", "Tumawid sa kanto."]
@@ -0,0 +1,57 @@
+# backend/tests/test_poi_store.py
+import types
+
+import pytest
+
+import utils.poi_store as poi_store
+from utils.poi_store import PoiStore
+
+LAT, LNG = 14.6, 120.98
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(poi_store, "time", types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def _place(place_id: str, north_m: float = 0.0) -> dict:
+    return {"place_id": place_id, "name": place_id, "types": ["restaurant"],
+            "geometry": {"location": {"lat": LAT + north_m / 111195.0, "lng": LNG}}}
+
+
+def test_tile_freshness_per_family_and_max_age(clock):
+    store = PoiStore(ttl_s=24 * 60 * 60)
+    store.ingest([_place("a"), _place("b", 20)], LAT, LNG, 60, family="landmark")
+
+    assert [p["place_id"] for p in store.query(LAT, LNG, 60, family="landmark")] == ["a", "b"]
+    # another family's search never vouched for this tile
+    assert store.query(LAT, LNG, 60, family="transport:jeep") is None
+
+    clock[0] += 2 * 60 * 60
+    assert store.query(LAT, LNG, 60, family="landmark", max_age_s=60 * 60) is None
+    assert store.query(LAT, LNG, 60, family="landmark") is not None
+
+    clock[0] += 24 * 60 * 60
+    assert store.query(LAT, LNG, 60, family="landmark") is None
+
+
+def test_min_results_threshold(clock):
+    store = PoiStore()
+    store.ingest([_place("a"), _place("b", 20), _place("far", 500)], LAT, LNG, 60, family="landmark")
+
+    assert len(store.query(LAT, LNG, 60, family="landmark", min_results=2)) == 2
+    assert store.query(LAT, LNG, 60, family="landmark", min_results=3) is None
+    assert store.stats()["thin"] == 1
+
+
+def test_moved_and_expired_places_leave_no_empty_tiles(clock):
+    store = PoiStore(tile_m=100, ttl_s=60 * 60)
+    store.ingest([_place("a")])
+    store.ingest([_place("a", 1000)])  # moved a kilometre: its old tile is now empty
+    assert store.stats()["tiles"] == 1
+
+    clock[0] += 2 * 60 * 60
+    store.ingest([_place("b", 5000)])
+    assert len(store) == 1 and store.stats()["tiles"] == 1
@@ -0,0 +1,30 @@
+# backend/tests/test_prefix_cache.py
+from utils.prefix_cache import PrefixCache
+
+
+def _cache() -> PrefixCache:
+    return PrefixCache(normalize=lambda text: text.lower(), text_key="description", page_size=5)
+
+
+def test_longer_prefix_is_filtered_from_an_exhaustive_shorter_one():
+    cache = _cache()
+    cache.set("ri", [{"description": "Rizal Avenue"}, {"description": "Recto Avenue"}])
+
+    assert cache.get("riz") == [{"description": "Rizal Avenue"}]
+    assert cache.stats()["filtered_hits"] == 1
+
+
+def test_empty_filtered_result_is_a_miss():
+    cache = _cache()
+    cache.set("fe", [{"description": "Far Eastern University, Nicanor Reyes Street, Sampaloc"}])
+
+    # Google answers "feu" by abbreviation; the local filter cannot
+    assert cache.get("feu") is None
+    assert cache.stats()["misses"] == 1 and cache.stats()["filtered_hits"] == 0
+
+
+def test_full_page_is_never_filtered():
+    cache = _cache()
+    cache.set("a", [{"description": f"Avenue {n}"} for n in range(5)])
+
+    assert cache.get("av") is None
@@ -0,0 +1,66 @@
+# backend/tests/test_route_match.py
+import numpy as np
+
+from utils.geometry import encode_polyline
+from utils.route_match import OFF_ROUTE_CONFIRM_FIXES, RouteLine, match_fixes
+
+M_PER_DEG = 111195.0  # meters per degree of latitude at EARTH_RADIUS_M
+LAT0, LNG0 = 14.6, 120.98
+COS = np.cos(np.radians(LAT0))
+
+
+def _at(north_m: float, east_m: float) -> dict:
+    return {"lat": LAT0 + north_m / M_PER_DEG, "lng": LNG0 + east_m / (M_PER_DEG * COS)}
+
+
+def _line() -> RouteLine:
+    """500 m north (step 0), then 500 m east (step 1)."""
+    corners = [_at(0, 0), _at(500, 0), _at(500, 500)]
+    return RouteLine(np.array([[p["lat"], p["lng"]] for p in corners]), step_offsets=[0, 1])
+
+
+def test_fixes_along_the_route_are_on_route():
+    result = match_fixes(_line(), [_at(100, 3), _at(200, -4), _at(500, 250)])
+    assert result["status"] == "on_route"
+    assert result["step_index"] == 1
+    assert abs(result["progress_m"] - 750) < 2
+    assert abs(result["remaining_m"] - 250) < 2
+    assert result["distance_from_route_m"] < 1
+
+
+def test_deviation_needs_consecutive_confirming_fixes():
+    off = [_at(100 + 10 * i, 100) for i in range(OFF_ROUTE_CONFIRM_FIXES)]
+    assert match_fixes(_line(), off)["status"] == "off_route"
+
+    # a single jittery fix, or an off streak that ends back on the route, is not a deviation
+    jitter = match_fixes(_line(), [_at(100, 0), _at(110, 0), _at(120, 100)])
+    assert jitter["status"] == "on_route" and jitter["off_route_fixes"] == 1
+    back = match_fixes(_line(), off + [_at(150, 0)])
+    assert back["status"] == "on_route" and back["off_route_fixes"] == 0
+
+
+def test_inaccurate_fixes_are_ignored():
+    fixes = [dict(_at(100, 300), accuracy=500) for _ in range(OFF_ROUTE_CONFIRM_FIXES)]
+    assert match_fixes(_line(), fixes) == {"status": "unknown", "reason": "no fix within accuracy limit", "fixes_used": 0}
+
+
+def test_walking_the_wrong_way_near_the_route_counts_as_off():
+    near = [dict(_at(300 - 20 * i, 20), heading=180) for i in range(OFF_ROUTE_CONFIRM_FIXES)]
+    assert match_fixes(_line(), near)["status"] == "off_route"
+    same_way = [dict(_at(300 + 20 * i, 20), heading=0) for i in range(OFF_ROUTE_CONFIRM_FIXES)]
+    assert match_fixes(_line(), same_way)["status"] == "on_route"
+
+
+def test_vectorized_locate_matches_per_fix_loop():
+    rng = np.random.default_rng(3)
+    points = np.cumsum(rng.normal(0, 0.0003, size=(60, 2)), axis=0) + (LAT0, LNG0)
+    line = RouteLine.from_polyline(encode_polyline(points))
+    lat = LAT0 + rng.normal(0, 0.003, 40)
+    lng = LNG0 + rng.normal(0, 0.003, 40)
+
+    batch = line.locate(lat, lng)
+    for i in range(len(lat)):
+        single = line.locate(lat[i:i + 1], lng[i:i + 1])
+        assert single["segment"][0] == batch["segment"][i]
+        np.testing.assert_allclose(single["cross_track_m"][0], batch["cross_track_m"][i])
+        np.testing.assert_allclose(single["progress_m"][0], batch["progress_m"][i])
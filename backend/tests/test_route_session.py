@@ -0,0 +1,111 @@
+# backend/tests/test_route_session.py
+import asyncio
+
+import numpy as np
+
+import routes.route as route_routes
+from utils.geometry import encode_polyline
+from utils.route_session import (
+    REJOIN_MAX_OFFSET_M,
+    REJOIN_MIN_AHEAD_M,
+    RouteSession,
+    RouteSessionStore,
+    rejoin_point,
+    splice_route,
+)
+
+M_PER_DEG = 111195.0  # meters per degree of latitude at EARTH_RADIUS_M
+LAT0, LNG0 = 14.6, 120.98
+COS = np.cos(np.radians(LAT0))
+DEST = (LAT0 + 500 / M_PER_DEG, LNG0)
+
+
+def _at(north_m: float, east_m: float = 0.0) -> dict:
+    return {"lat": LAT0 + north_m / M_PER_DEG, "lng": LNG0 + east_m / (M_PER_DEG * COS)}
+
+
+def _step(start: dict, end: dict, meters: int, instruction: str) -> dict:
+    return {
+        "instruction": instruction,
+        "maneuver": None,
+        "lat": start["lat"],
+        "lng": start["lng"],
+        "distance": {"text": f"{meters} m", "value": meters},
+        "duration": {"text": "1 min", "value": meters},
+        "polyline": encode_polyline([(start["lat"], start["lng"]), (end["lat"], end["lng"])]),
+    }
+
+
+def _route() -> dict:
+    """500 m due north in five 100 m steps."""
+    steps = [_step(_at(100 * i), _at(100 * (i + 1)), 100, f"step {i}") for i in range(5)]
+    return {
+        "steps": steps,
+        "polyline": encode_polyline([(_at(0)["lat"], LNG0), DEST]),
+        "mode": "walking",
+        "destination": {"lat": DEST[0], "lng": DEST[1]},
+        "distance": {"text": "500 m", "value": 500},
+        "duration": {"text": "8 mins", "value": 500},
+    }
+
+
+def _detour(start: dict, end: dict) -> dict:
+    return {"steps": [_step(start, end, 80, "detour")], "destination": end, "start_address": "here"}
+
+
+def test_rejoin_is_the_first_boundary_far_enough_ahead():
+    session = RouteSession("r", _route())
+    assert REJOIN_MIN_AHEAD_M == 60
+    # 30 m along: the 100 m boundary is 70 m ahead
+    assert rejoin_point(session, **_at(30, 20))["step_index"] == 1
+    # 50 m along: the 100 m boundary is only 50 m ahead, so rejoin at 200 m
+    rejoin = rejoin_point(session, **_at(50, 20))
+    assert rejoin["step_index"] == 2 and abs(rejoin["progress_m"] - 200) < 1
+
+
+def test_no_rejoin_when_too_far_off_or_near_the_end():
+    session = RouteSession("r", _route())
+    assert rejoin_point(session, **_at(200, REJOIN_MAX_OFFSET_M - 20)) is not None
+    assert rejoin_point(session, **_at(200, REJOIN_MAX_OFFSET_M + 20)) is None
+    assert rejoin_point(session, **_at(470, 10)) is None
+
+
+def test_splice_keeps_the_route_from_the_rejoin_step():
+    route = _route()
+    rejoin = rejoin_point(RouteSession("r", route), **_at(50, 20))
+    spliced = splice_route(route, _detour(_at(50, 20), _at(200)), rejoin)
+
+    assert [s["instruction"] for s in spliced["steps"]] == ["detour", "step 2", "step 3", "step 4"]
+    assert spliced["distance"]["value"] == 80 + 300
+    # a detour Google snapped away from the rejoin point is not spliced
+    assert splice_route(route, _detour(_at(50, 20), _at(250)), rejoin) is None
+
+
+def test_replace_re_adds_an_evicted_session():
+    store = RouteSessionStore(max_entries=1)
+    route_id = store.create(_route())
+    session = store.get(route_id)
+    store.create(_route())  # evicts the first session
+    assert store.get(route_id) is None
+
+    store.replace(session, _route())
+    assert store.get(route_id) is session and session.revision == 1
+
+
+def test_compact_reroute_returns_only_the_detour(monkeypatch):
+    route_id = route_routes.ROUTE_SESSIONS.create(_route(), language="tl")
+    walker = _at(50, 20)
+
+    async def fake_fetch(origin, destination, **kwargs):
+        lat, lng = (float(v) for v in destination.split(","))
+        return _detour(walker, {"lat": lat, "lng": lng})
+
+    monkeypatch.setattr(route_routes, "fetch_route_async", fake_fetch)
+    payload = asyncio.run(route_routes.reroute(
+        walker["lat"], walker["lng"], DEST[0], DEST[1], route_id=route_id, compact=True,
+    ))
+
+    assert payload["route_id"] == route_id
+    assert payload["splice"] == {"rejoin_step": 2, "detour_steps": 1, "revision": 1}
+    assert [s["instruction"] for s in payload["steps"]] == ["detour"]
+    assert len(route_routes.ROUTE_SESSIONS.get(route_id).route["steps"]) == 4
@@ -0,0 +1,87 @@
+# backend/tests/test_single_flight.py
+import asyncio
+
+import httpx
+import pytest
+
+import utils.maps_client as maps_client
+from utils.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_result():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"status": "OK"}
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats()["coalesced"] == 4 and flight.stats()["in_flight"] == 0
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    flight = SingleFlight()
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        raise RuntimeError("upstream down")
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", failing) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(run()))
+    assert len(calls) == 1
+    with pytest.raises(RuntimeError):
+        asyncio.run(flight.do("key", failing))
+    assert len(calls) == 2
+
+
+def test_cancelled_leader_hands_over_to_a_follower():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        leader = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(run()) == "done"
+    assert len(calls) == 2
+
+
+def test_identical_maps_requests_hit_google_once(monkeypatch):
+    requests = []
+
+    async def handler(request):
+        requests.append(str(request.url))
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"status": "OK", "results": []})
+
+    monkeypatch.setattr(maps_client, "_MAPS_HTTP_CLIENT", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    params = {"address": "Quiapo Church", "key": "k", "region": None}
+
+    async def run():
+        return await asyncio.gather(
+            *(maps_client._request_with_retries_async(maps_client.GEOCODE_URL, params) for _ in range(4)),
+            maps_client._request_with_retries_async(maps_client.GEOCODE_URL, {**params, "address": "Binondo"}),
+        )
+
+    asyncio.run(run())
+    assert len(requests) == 2
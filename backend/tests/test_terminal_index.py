@@ -0,0 +1,43 @@
+# backend/tests/test_terminal_index.py
+import random
+
+from utils.geo_cache import haversine_m
+from utils.terminal_index import TERMINAL_KINDS, TerminalIndex
+
+
+def _index(count: int, rng: random.Random) -> TerminalIndex:
+    return TerminalIndex([
+        {"place_id": f"local:{i}", "kind": rng.choice(TERMINAL_KINDS), "name": None, "address": None,
+         "lat": rng.uniform(14.40, 14.78), "lng": rng.uniform(120.90, 121.13), "source": "local"}
+        for i in range(count)
+    ])
+
+
+def _brute_force(index: TerminalIndex, kind: str, lat: float, lng: float):
+    return sorted(
+        (haversine_m(lat, lng, t["lat"], t["lng"]), t["place_id"])
+        for t in index.terminals if t["kind"] == kind
+    )
+
+
+def test_kd_tree_matches_brute_force():
+    rng = random.Random(7)
+    index = _index(3000, rng)
+    for _ in range(200):
+        lat, lng = rng.uniform(14.40, 14.78), rng.uniform(120.90, 121.13)
+        for kind in TERMINAL_KINDS:
+            expected = _brute_force(index, kind, lat, lng)
+
+            within = [row["place_id"] for row in index.within(kind, lat, lng, 1400)]
+            assert within == [pid for dist, pid in expected if dist <= 1400]
+
+            nearest = [row["place_id"] for row in index.nearest(kind, lat, lng, k=5)]
+            assert nearest == [pid for _, pid in expected[:5]]
+
+            capped = [row["place_id"] for row in index.nearest(kind, lat, lng, k=5, max_radius_m=500)]
+            assert capped == [pid for dist, pid in expected[:5] if dist <= 500]
+
+
+def test_unknown_kind_and_empty_index():
+    assert TerminalIndex([]).within("jeep", 14.6, 121.0, 1000) == []
+    assert _index(10, random.Random(1)).nearest("boat", 14.6, 121.0) == []
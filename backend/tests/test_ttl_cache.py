@@ -0,0 +1,23 @@
+# backend/tests/test_ttl_cache.py
+from utils.ttl_cache import TTLCache
+
+
+def test_byte_bound_evicts_least_recently_used():
+    cache = TTLCache(max_entries=100, max_bytes=250, size_of=len)
+    cache.set("a", "x" * 100)
+    cache.set("b", "x" * 100)
+    assert cache.get("a") is not None  # "b" is now least recently used
+    cache.set("c", "x" * 100)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["bytes"] == 200 and cache.evictions == 1
+
+
+def test_replacing_and_popping_keep_the_byte_count():
+    cache = TTLCache(max_bytes=1000, size_of=len)
+    cache.set("a", "x" * 300)
+    cache.set("a", "x" * 100)
+    assert cache.stats()["bytes"] == 100
+    cache.pop("a")
+    assert cache.stats()["bytes"] == 0
@@ -0,0 +1,102 @@
+# backend/tests/test_tts_cache.py
+import asyncio
+import os
+import time
+
+import services.tts_cache as tts_cache
+from services.tts_cache import TTSDiskCache
+
+
+def test_synthesis_lock_is_per_key(tmp_path):
+    cache = TTSDiskCache(str(tmp_path), sweep_interval_s=0)
+    # a line and a fragment whose keys share a prefix: the old 3-char stripes put them on one file
+    line_key = "852b5af2" + "0" * 56
+    fragment_key = "852" + "f" * 61
+
+    async def nested():
+        async with cache.synthesis_lock(line_key, timeout_s=5) as outer:
+            async with cache.synthesis_lock(fragment_key, timeout_s=0.2) as inner:
+                return outer, inner
+
+    assert asyncio.run(nested()) == (True, True)
+
+
+def test_synthesis_lock_excludes_same_key_and_cleans_up(tmp_path):
+    cache = TTSDiskCache(str(tmp_path), sweep_interval_s=0)
+    key = "a" * 64
+
+    async def contend():
+        async with cache.synthesis_lock(key, timeout_s=1) as first:
+            async with cache.synthesis_lock(key, timeout_s=0.1) as second:
+                held = (first, second)
+        async with cache.synthesis_lock(key, timeout_s=0.1) as again:
+            return held, again
+
+    assert asyncio.run(contend()) == ((True, False), True)
+    assert list((tmp_path / "locks").iterdir()) == []
+
+
+def test_write_and_lookup_record_hits(tmp_path):
+    cache = TTSDiskCache(str(tmp_path), sweep_interval_s=0)
+    assert cache.lookup("k") is None
+    path = cache.write("k", b"audio")
+    assert cache.lookup("k") == path
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    assert not [name for name in (p.name for p in tmp_path.iterdir()) if name.endswith(".tmp")]
+
+
+def _filled_cache(tmp_path, policy: str) -> TTSDiskCache:
+    """800 of 1000 bytes in four entries, all older than TTS_CACHE_MIN_IDLE_S."""
+    cache = TTSDiskCache(str(tmp_path), max_bytes=1000, policy=policy, sweep_interval_s=0)
+    now = time.time()
+    for key, age, hits in (("a", 1000, 5), ("b", 800, 0), ("c", 600, 3), ("d", 400, 2)):
+        path = cache.write(key, b"x" * 200)
+        os.utime(path, (now - age, now - age))
+        cache._conn.execute("UPDATE entries SET accessed_at = ?, hits = ? WHERE key = ?", (now - age, hits, key))
+    return cache
+
+
+def _cached_keys(cache: TTSDiskCache):
+    return sorted(key for key in "abcde" if os.path.exists(cache.path(key)))
+
+
+def test_lru_evicts_least_recently_used_down_to_low_water(tmp_path):
+    cache = _filled_cache(tmp_path, "lru")
+    cache.write("e", b"x" * 300)  # 1100 bytes: evict to 900 at most
+
+    assert _cached_keys(cache) == ["b", "c", "d", "e"]
+    assert cache.stats()["bytes"] == 900 and cache.evictions == 1
+
+
+def test_lfu_evicts_least_frequently_used(tmp_path):
+    cache = _filled_cache(tmp_path, "lfu")
+    cache.write("e", b"x" * 300)
+
+    assert _cached_keys(cache) == ["a", "c", "d", "e"]
+
+
+def test_recently_used_entries_are_never_evicted(tmp_path):
+    cache = TTSDiskCache(str(tmp_path), max_bytes=1000, sweep_interval_s=0)
+    for key in "abcde":
+        cache.write(key, b"x" * 300)
+
+    assert _cached_keys(cache) == list("abcde")
+    assert cache.evictions == 0
+
+
+def test_eviction_removes_files_outside_the_index_lock(tmp_path, monkeypatch):
+    cache = _filled_cache(tmp_path, "lru")
+    remove = os.remove
+    lock_free = []
+
+    def checking_remove(path):
+        acquired = cache._lock.acquire(blocking=False)
+        lock_free.append(acquired)
+        if acquired:
+            cache._lock.release()
+        remove(path)
+
+    monkeypatch.setattr(tts_cache.os, "remove", checking_remove)
+    cache.write("e", b"x" * 300)
+
+    assert lock_free == [True]
@@ -0,0 +1,131 @@
+# backend/tests/test_tts_routes.py
+import asyncio
+import json
+import os
+
+import httpx
+import pytest
+
+import main
+import services.tts_service as tts_service
+from routes import tts as tts_routes
+
+FRAME = b"\xff\xf3\x64\xc4" + b"\x01" * 140  # one MPEG-2 Layer III frame, 24 kHz mono
+
+
+@pytest.fixture
+def speech_calls(monkeypatch):
+    """Route OpenAI speech requests to a slow in-process fake; yields the texts requested."""
+    calls = []
+
+    async def handler(request):
+        calls.append(json.loads(request.content)["input"])
+        await asyncio.sleep(0.2)
+        return httpx.Response(200, content=FRAME * 8)
+
+    monkeypatch.setattr(tts_service, "_TTS_HTTP_CLIENT", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return calls
+
+
+def _get_many(params_list, headers=None):
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.get("/tts", params=p, headers=headers) for p in params_list))
+    return asyncio.run(run())
+
+
+def test_concurrent_misses_share_one_synthesis(speech_calls):
+    responses = _get_many([{"text": "Magpatuloy sa kanan"}] * 5)
+    assert [r.status_code for r in responses] == [200] * 5
+    assert len({r.content for r in responses}) == 1
+    assert speech_calls == ["Makinig. Magpatuloy sa kanan."]
+
+
+def test_concurrent_stream_misses_share_one_upstream(speech_calls):
+    params = {"text": "Lumiko pakaliwa sa kanto", "stream": "true"}
+    responses = _get_many([params] * 4 + [{"text": params["text"]}])
+    assert [r.status_code for r in responses] == [200] * 5
+    assert {r.content for r in responses} == {FRAME * 8}
+    assert speech_calls == ["Makinig. Lumiko pakaliwa sa kanto."]
+    assert tts_routes._TTS_STREAMS == {}
+
+    (hit,) = _get_many([{"text": params["text"]}])
+    assert hit.headers["x-tts-cache"] == "HIT"
+
+
+def test_stream_miss_is_cached_only_when_complete():
+    class Upstream:
+        def __init__(self, fail: bool):
+            self.fail = fail
+
+        async def aiter_bytes(self):
+            yield FRAME
+            if self.fail:
+                raise httpx.ReadError("connection reset")
+            yield FRAME
+
+        async def aclose(self):
+            pass
+
+    async def consume(key: str, fail: bool) -> bytes:
+        received = b""
+        try:
+            async for chunk in tts_routes._tee_to_cache(Upstream(fail), key):
+                received += chunk
+        except httpx.ReadError:
+            pass
+        return received
+
+    assert asyncio.run(consume("b" * 64, fail=True)) == FRAME
+    assert tts_routes.TTS_CACHE.lookup("b" * 64) is None
+    assert asyncio.run(consume("c" * 64, fail=False)) == FRAME * 2
+    with open(tts_routes.TTS_CACHE.lookup("c" * 64), "rb") as f:
+        assert f.read() == FRAME * 2
+    tmp_files = [n for n in os.listdir(tts_routes.TTS_CACHE.directory) if n.endswith(".tmp")]
+    assert tmp_files == []
+
+
+def test_etag_range_and_conditional_requests(speech_calls):
+    params = {"text": "Malapit na"}
+    (first,) = _get_many([params])
+    etag = first.headers["etag"]
+    assert etag.startswith('"') and etag.endswith('"')
+    full = first.content
+
+    (not_modified,) = _get_many([params], headers={"If-None-Match": f'W/"other", {etag}'})
+    assert not_modified.status_code == 304 and not_modified.content == b""
+
+    # enough hits to promote the clip into the memory tier, then ranges from memory
+    _get_many([params])
+    _get_many([params])
+    (partial,) = _get_many([params], headers={"Range": "bytes=10-19"})
+    assert partial.status_code == 206
+    assert partial.headers["x-tts-tier"] == "memory"
+    assert partial.headers["content-range"] == f"bytes 10-19/{len(full)}"
+    assert partial.content == full[10:20]
+
+    (suffix,) = _get_many([params], headers={"Range": "bytes=-5"})
+    assert suffix.status_code == 206 and suffix.content == full[-5:]
+
+    (unsatisfiable,) = _get_many([params], headers={"Range": f"bytes={len(full)}-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == f"bytes */{len(full)}"
+
+    (stale_if_range,) = _get_many([params], headers={"Range": "bytes=0-1", "If-Range": '"other"'})
+    assert stale_if_range.status_code == 200 and stale_if_range.content == full
+
+    (weak_if_range,) = _get_many([params], headers={"Range": "bytes=0-1", "If-Range": f"W/{etag}"})
+    assert weak_if_range.status_code == 200 and weak_if_range.content == full
+    (strong_if_range,) = _get_many([params], headers={"Range": "bytes=0-1", "If-Range": etag})
+    assert strong_if_range.status_code == 206
+    assert speech_calls == ["Makinig. Malapit na."]
+
+
+def test_wildcard_if_none_match_needs_an_existing_clip():
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/tts/clip/" + "0" * 64, headers={"If-None-Match": "*"})
+
+    assert asyncio.run(run()).status_code == 404
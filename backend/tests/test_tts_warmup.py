@@ -0,0 +1,31 @@
+# backend/tests/test_tts_warmup.py
+import asyncio
+import json
+
+import httpx
+
+import services.tts_service as tts_service
+from services.tts_cache import TTS_CACHE
+from services.tts_warmup import warm_tts_cache, warmup_plan
+
+FRAME = b"\xff\xf3\x64\xc4" + b"\x01" * 140  # one MPEG-2 Layer III frame, 24 kHz mono
+
+
+def test_concurrent_warmups_synthesize_each_line_once(monkeypatch):
+    calls = []
+
+    async def handler(request):
+        calls.append(json.loads(request.content)["input"])
+        await asyncio.sleep(0.1)
+        return httpx.Response(200, content=FRAME * 4)
+
+    monkeypatch.setattr(tts_service, "_TTS_HTTP_CLIENT", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    plan = warmup_plan(["Dumiretso sa warm-up", "Tumawid sa warm-up"], voices=["alloy"], styles=["calm"], segments=False)
+
+    async def run():
+        # two workers warming at startup at the same moment
+        return await asyncio.gather(warm_tts_cache(plan), warm_tts_cache(plan))
+
+    asyncio.run(run())
+    assert sorted(calls) == sorted(item["text"] for item in plan)
+    assert all(TTS_CACHE.lookup(item["key"]) for item in plan)
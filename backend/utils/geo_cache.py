@@ -0,0 +1,158 @@
+# backend/utils/geo_cache.py
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEG_LAT = 111320.0
+
+Cell = Tuple[int, int]
+
+_MISSING = object()
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Compute straight-line distance in meters between two coordinates."""
+    p1 = math.radians(lat1)
+    p2 = math.radians(lat2)
+    dp = math.radians(lat2 - lat1)
+    dl = math.radians(lng2 - lng1)
+
+    a = math.sin(dp / 2.0) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2.0) ** 2
+    return EARTH_RADIUS_M * 2.0 * math.atan2(math.sqrt(a), math.sqrt(1.0 - a))
+
+
+def _lng_step(row: int, lat_step: float) -> float:
+    """Longitude width of a cell in a given row, so cells stay roughly square away from the equator."""
+    row_lat = (row + 0.5) * lat_step
+    return lat_step / max(math.cos(math.radians(row_lat)), 1e-6)
+
+
+def grid_cell(lat: float, lng: float, cell_m: float) -> Cell:
+    """Snap a coordinate to an integer (row, col) grid cell roughly cell_m meters wide."""
+    lat_step = cell_m / METERS_PER_DEG_LAT
+    row = math.floor(lat / lat_step)
+    return row, math.floor(lng / _lng_step(row, lat_step))
+
+
+def cell_center(cell: Cell, cell_m: float) -> Tuple[float, float]:
+    """Return the (lat, lng) at the middle of a grid cell."""
+    lat_step = cell_m / METERS_PER_DEG_LAT
+    row, col = cell
+    return (row + 0.5) * lat_step, (col + 0.5) * _lng_step(row, lat_step)
+
+
+def neighbor_cells(lat: float, lng: float, cell_m: float, rings: int = 1) -> Iterator[Cell]:
+    """Yield the containing cell first, then every cell within `rings` cells of it."""
+    lat_step = cell_m / METERS_PER_DEG_LAT
+    row0 = math.floor(lat / lat_step)
+    center = grid_cell(lat, lng, cell_m)
+    yield center
+
+    for d_row in range(-rings, rings + 1):
+        row = row0 + d_row
+        col0 = math.floor(lng / _lng_step(row, lat_step))
+        for d_col in range(-rings, rings + 1):
+            cell = (row, col0 + d_col)
+            if cell != center:
+                yield cell
+
+
+class GridCache:
+    """
+    Spatial answer cache: one entry per grid cell, looked up from the containing
+    and adjacent cells so nearby callers share a result.
+
+    Entries expire after `ttl_s` (or `negative_ttl_s` for None values) and the
+    least recently used cell is evicted once `max_entries` is reached.
+    """
+
+    def __init__(
+        self,
+        cell_m: float = 30.0,
+        reuse_radius_m: float = 30.0,
+        max_entries: int = 5000,
+        ttl_s: float = 60 * 60,
+        negative_ttl_s: float = 10 * 60,
+    ):
+        self.cell_m = cell_m
+        self.reuse_radius_m = reuse_radius_m
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.negative_ttl_s = negative_ttl_s
+        self._rings = max(1, math.ceil(reuse_radius_m / cell_m))
+        self._entries: "OrderedDict[Cell, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _is_fresh(self, entry: Dict[str, Any], now: float) -> bool:
+        ttl = self.negative_ttl_s if entry["value"] is None else self.ttl_s
+        return now - entry["ts"] < ttl
+
+    def get(self, lat: float, lng: float, default: Any = None) -> Any:
+        """Return the nearest fresh value within reuse_radius_m, or `default` on a miss."""
+        now = time.time()
+        best_cell: Optional[Cell] = None
+        best_dist = self.reuse_radius_m
+
+        for cell in neighbor_cells(lat, lng, self.cell_m, self._rings):
+            entry = self._entries.get(cell)
+            if entry is None:
+                continue
+            if not self._is_fresh(entry, now):
+                del self._entries[cell]
+                continue
+            dist = haversine_m(lat, lng, entry["lat"], entry["lng"])
+            if dist <= best_dist:
+                best_cell = cell
+                best_dist = dist
+
+        if best_cell is None:
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(best_cell)
+        value = self._entries[best_cell]["value"]
+        if value is None:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return value
+
+    def lookup(self, lat: float, lng: float) -> Tuple[bool, Any]:
+        """Like get(), but distinguishes a cached None (negative result) from a miss."""
+        value = self.get(lat, lng, _MISSING)
+        if value is _MISSING:
+            return False, None
+        return True, value
+
+    def put(self, lat: float, lng: float, value: Any) -> None:
+        """Store a value (None for a negative result) for the cell containing lat/lng."""
+        cell = grid_cell(lat, lng, self.cell_m)
+        self._entries[cell] = {"lat": lat, "lng": lng, "value": value, "ts": time.time()}
+        self._entries.move_to_end(cell)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+        }
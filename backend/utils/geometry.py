@@ -0,0 +1,258 @@
+# backend/utils/geometry.py
+import math
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from utils.geo_cache import EARTH_RADIUS_M
+
+# Google polyline precision (1e5 = ~1.1 m)
+POLYLINE_PRECISION = 5
+_SCALE = 10 ** POLYLINE_PRECISION
+
+# Web-mercator ground resolution at the equator, zoom 0
+METERS_PER_PIXEL_Z0 = 156543.03392
+
+# Zoom levels a client gets pre-simplified geometry for, and how many screen
+# pixels of deviation a simplified line may have at that zoom
+DEFAULT_ZOOMS = tuple(int(z) for z in os.getenv("GEOMETRY_ZOOMS", "12,14,16").split(","))
+TOLERANCE_PX = float(os.getenv("GEOMETRY_TOLERANCE_PX", "1.0"))
+
+GEOMETRY_FORMATS = ("encoded", "delta")
+
+Points = Union[np.ndarray, Sequence[Sequence[float]]]
+
+
+# --------------------------------------------------------
+# POLYLINE CODEC
+# --------------------------------------------------------
+def decode_polyline(encoded: str) -> np.ndarray:
+    """Decode a Google encoded polyline into an (N, 2) float array of lat/lng."""
+    if not encoded:
+        return np.empty((0, 2), dtype=np.float64)
+
+    chunks = np.frombuffer(encoded.encode("ascii"), dtype=np.uint8).astype(np.int64) - 63
+    if chunks.min() < 0 or chunks.max() > 63:
+        raise ValueError("invalid polyline character")
+
+    # a value ends at the first chunk without the 0x20 continuation bit
+    ends = np.flatnonzero((chunks & 0x20) == 0)
+    if ends.size == 0 or ends[-1] != chunks.size - 1 or ends.size % 2:
+        raise ValueError("truncated polyline")
+
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    group = np.repeat(np.arange(ends.size), ends - starts + 1)
+    shifts = 5 * (np.arange(chunks.size) - starts[group])
+    values = np.add.reduceat((chunks & 0x1F) << shifts, starts)
+
+    # zig-zag decode, then undo the per-axis delta encoding
+    deltas = np.where(values & 1, ~(values >> 1), values >> 1).reshape(-1, 2)
+    return np.cumsum(deltas, axis=0) / _SCALE
+
+
+def _encode_values(values: np.ndarray) -> str:
+    """Varint-encode signed integers as polyline characters."""
+    if values.size == 0:
+        return ""
+    zigzag = np.where(values < 0, ~(values << 1), values << 1).astype(np.int64)
+
+    # up to 7 five-bit chunks per value covers the full int32 range
+    shifts = 5 * np.arange(7)
+    parts = (zigzag[:, None] >> shifts) & 0x1F
+    count = 1 + ((zigzag[:, None] >> shifts[1:]) > 0).sum(axis=1)
+    used = np.arange(7)[None, :] < count[:, None]
+    more = np.arange(7)[None, :] < (count[:, None] - 1)
+    chars = (parts | (more * 0x20)) + 63
+    return chars[used].astype(np.uint8).tobytes().decode("ascii")
+
+
+def to_e5(points: Points) -> np.ndarray:
+    """Round lat/lng to the polyline's integer grid."""
+    return np.round(np.asarray(points, dtype=np.float64).reshape(-1, 2) * _SCALE).astype(np.int64)
+
+
+def encode_polyline(points: Points) -> str:
+    """Encode (N, 2) lat/lng points as a Google polyline string."""
+    ints = to_e5(points)
+    if not len(ints):
+        return ""
+    deltas = np.diff(ints, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+    return _encode_values(deltas.ravel())
+
+
+def delta_encode(points: Points) -> List[int]:
+    """Flat [lat0, lng0, dlat1, dlng1, ...] integers at 1e5 precision."""
+    ints = to_e5(points)
+    if not len(ints):
+        return []
+    return np.diff(ints, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel().tolist()
+
+
+# --------------------------------------------------------
+# SIMPLIFICATION
+# --------------------------------------------------------
+def _project(points: np.ndarray) -> np.ndarray:
+    """Equirectangular meters around the line's mean latitude; plenty for a route's extent."""
+    cos_ref = math.cos(math.radians(float(points[:, 0].mean())))
+    rad = np.radians(points)
+    return np.column_stack((rad[:, 1] * cos_ref, rad[:, 0])) * EARTH_RADIUS_M
+
+
+def _segment_distances(xy: np.ndarray, start: int, end: int) -> np.ndarray:
+    """Distance of every point strictly between start and end to the segment joining them."""
+    a = xy[start]
+    ab = xy[end] - a
+    ap = xy[start + 1:end] - a
+    denom = float(ab @ ab)
+    if denom == 0.0:
+        return np.hypot(ap[:, 0], ap[:, 1])
+    t = np.clip((ap @ ab) / denom, 0.0, 1.0)
+    closest = np.outer(t, ab)
+    return np.hypot(ap[:, 0] - closest[:, 0], ap[:, 1] - closest[:, 1])
+
+
+def simplification_ranks(points: Points, min_tolerance_m: float = 0.0) -> np.ndarray:
+    """
+    Douglas-Peucker importance of every vertex: the largest tolerance (meters)
+    at which the vertex survives. Endpoints are infinite. Ranks are nested, so
+    `ranks > tol` gives the simplification for any tol >= min_tolerance_m
+    without re-running the algorithm per zoom level.
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    n = len(pts)
+    ranks = np.zeros(n)
+    if n == 0:
+        return ranks
+    ranks[0] = ranks[-1] = np.inf
+    if n < 3:
+        return ranks
+
+    xy = _project(pts)
+    stack = [(0, n - 1, np.inf)]
+    while stack:
+        start, end, parent = stack.pop()
+        if end - start < 2:
+            continue
+        dists = _segment_distances(xy, start, end)
+        offset = int(np.argmax(dists))
+        dmax = float(dists[offset])
+        if dmax <= min_tolerance_m:
+            continue
+        split = start + 1 + offset
+        # a child never outranks the split that exposed it
+        rank = min(dmax, parent)
+        ranks[split] = rank
+        stack.append((start, split, rank))
+        stack.append((split, end, rank))
+    return ranks
+
+
+def meters_per_pixel(zoom: int, lat: float) -> float:
+    return METERS_PER_PIXEL_Z0 * math.cos(math.radians(lat)) / (2 ** zoom)
+
+
+def zoom_tolerance_m(zoom: int, lat: float, tolerance_px: float = TOLERANCE_PX) -> float:
+    return meters_per_pixel(zoom, lat) * tolerance_px
+
+
+def simplify(points: Points, tolerance_m: float) -> np.ndarray:
+    """Douglas-Peucker simplification of lat/lng points to `tolerance_m` meters."""
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    return pts[simplification_ranks(pts, tolerance_m) > tolerance_m]
+
+
+# --------------------------------------------------------
+# RESAMPLING
+# --------------------------------------------------------
+def resample(points: Points, spacing_m: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Points every `spacing_m` meters along the line, plus its last vertex,
+    and each one's distance (meters) from the start of the line.
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(pts) < 2:
+        return pts, np.zeros(len(pts))
+
+    xy = _project(pts)
+    along = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(xy, axis=0).T))))
+    total = float(along[-1])
+    targets = np.arange(0.0, total, max(spacing_m, 1.0))
+    if not len(targets) or total - targets[-1] > 1e-6:
+        targets = np.append(targets, total)
+
+    samples = np.column_stack((np.interp(targets, along, pts[:, 0]), np.interp(targets, along, pts[:, 1])))
+    return samples, targets
+
+
+# --------------------------------------------------------
+# ROUTE GEOMETRY
+# --------------------------------------------------------
+def _step_points(steps: Iterable[Dict[str, Any]]) -> Optional[List[np.ndarray]]:
+    decoded = []
+    for step in steps:
+        encoded = step.get("polyline")
+        if not isinstance(encoded, str) or not encoded:
+            return None
+        decoded.append(decode_polyline(encoded))
+    return decoded or None
+
+
+def _format(points: np.ndarray, fmt: str) -> Union[str, List[int]]:
+    return delta_encode(points) if fmt == "delta" else encode_polyline(points)
+
+
+def route_points(route: Dict[str, Any]) -> Tuple[np.ndarray, Optional[List[int]]]:
+    """
+    Full-resolution route line: the step polylines joined (or the overview when
+    a step has none), and the index of each step's first vertex in that line.
+    """
+    step_points = _step_points(route.get("steps") or [])
+    if not step_points:
+        return decode_polyline(route.get("polyline") or ""), None
+
+    parts = []
+    offsets = []
+    count = 0
+    for pts in step_points:
+        # consecutive steps share their joining vertex
+        if parts and len(pts) and len(parts[-1]) and np.array_equal(to_e5(parts[-1][-1:]), to_e5(pts[:1])):
+            pts = pts[1:]
+            offsets.append(count - 1)
+        else:
+            offsets.append(count)
+        parts.append(pts)
+        count += len(pts)
+    return np.concatenate(parts), offsets
+
+
+def route_geometry(route: Dict[str, Any], fmt: str = "encoded", zooms: Sequence[int] = DEFAULT_ZOOMS) -> Dict[str, Any]:
+    """
+    The route_points() line plus one pre-simplified copy per zoom level, in
+    `fmt`: "encoded" polyline strings or "delta" integer arrays.
+    step_offsets[i] is the index of step i's first vertex in the full line.
+    """
+    if fmt not in GEOMETRY_FORMATS:
+        raise ValueError(f"unknown geometry format {fmt!r}")
+
+    full, offsets = route_points(route)
+
+    zooms = sorted(set(int(z) for z in zooms))
+    levels: Dict[str, Any] = {}
+    if len(full):
+        lat = float(full[:, 0].mean())
+        tolerances = {z: zoom_tolerance_m(z, lat) for z in zooms}
+        ranks = simplification_ranks(full, min(tolerances.values(), default=0.0))
+        for z in zooms:
+            levels[str(z)] = _format(full[ranks > tolerances[z]], fmt)
+
+    return {
+        "format": fmt,
+        "precision": POLYLINE_PRECISION,
+        "points": len(full),
+        "full": _format(full, fmt),
+        "zooms": levels,
+        "step_offsets": offsets,
+    }
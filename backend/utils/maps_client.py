@@ -1,12 +1,24 @@
 # backend/utils/maps_client.py
 import os
 import time
-import requests
+import asyncio
+import httpx
 import html
+import json
 import re
+import unicodedata
 from dotenv import load_dotenv
 from typing import Optional, Dict, Any, List, Union
 
+from utils.geo_cache import cell_center, grid_cell, haversine_m
+from utils.geometry import decode_polyline
+from utils.poi_store import PoiStore
+from utils.prefix_cache import PrefixCache
+from utils.single_flight import SingleFlight
+from utils.terminal_index import load_terminal_index
+from utils.sqlite_cache import SQLiteCache
+from utils.ttl_cache import TTLCache, FRESH, STALE
+
 load_dotenv()
 
 # Accept either env var name used previously (compatibility)
@@ -20,23 +32,126 @@ AUTOCOMPLETE_URL = "https://maps.googleapis.com/maps/api/place/autocomplete/json
 PLACE_DETAILS_URL = "https://maps.googleapis.com/maps/api/place/details/json"
 PLACES_NEARBY_URL = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
 
-# small helper for retrying transient errors
-def _request_with_retries(url: str, params: dict, timeout: float = 6.0, retries: int = 2, backoff: float = 0.3):
-    last_exc = None
-    for attempt in range(retries + 1):
-        try:
-            resp = requests.get(url, params=params, timeout=timeout)
-            resp.raise_for_status()
-            return resp.json()
-        except requests.RequestException as e:
-            last_exc = e
-            if attempt < retries:
-                time.sleep(backoff * (2 ** attempt))
-            else:
-                # raise the last exception up
-                raise
-    # Shouldn't reach here
-    raise last_exc
+_MAPS_HTTP_CLIENT: Optional[httpx.AsyncClient] = None
+
+# identical concurrent Google calls (same endpoint + params) share one request
+MAPS_SINGLE_FLIGHT = SingleFlight()
+
+# Walking routes barely change within a day; traffic-sensitive modes expire fast.
+# Entries stay servable for one more TTL while a background refresh runs.
+DIRECTIONS_TTL_BY_MODE = {
+    "walking": 24 * 60 * 60,
+    "bicycling": 12 * 60 * 60,
+    "driving": 10 * 60,
+    "transit": 5 * 60,
+}
+DIRECTIONS_CACHE_CELL_M = float(os.getenv("DIRECTIONS_CACHE_CELL_M", "25"))
+# Raw walking responses with step polylines run to tens of KB, so the cache is
+# bounded by their (JSON) size as well as by count
+DIRECTIONS_CACHE = TTLCache(
+    max_entries=int(os.getenv("DIRECTIONS_CACHE_MAX_ENTRIES", "2000")),
+    max_bytes=int(float(os.getenv("DIRECTIONS_CACHE_MAX_MB", "32")) * 1024 * 1024),
+    size_of=lambda data: len(json.dumps(data)),
+)
+
+# Geocodes of named places almost never move; misspellings are retried daily
+GEOCODE_TTL = 30 * 24 * 60 * 60
+GEOCODE_NEGATIVE_TTL = 24 * 60 * 60
+GEOCODE_CACHE = SQLiteCache("geocode")
+
+# Spellings people use for the same destination, keyed by normalized query text
+PLACE_QUERY_ALIASES = {
+    "sm city manila": "sm manila",
+    "far eastern university": "feu",
+    "university of santo tomas": "ust",
+    "polytechnic university of the philippines": "pup",
+    "university of the philippines diliman": "up diliman",
+    "de la salle university": "dlsu",
+    "quiapo church": "minor basilica of the black nazarene",
+    "divisoria mall": "divisoria",
+}
+
+# Google returns at most 5 predictions, so a shorter list is the complete answer
+AUTOCOMPLETE_PAGE_SIZE = 5
+AUTOCOMPLETE_CACHE = PrefixCache(
+    normalize=lambda text: _normalize_query_text(text),
+    text_key="description",
+    page_size=AUTOCOMPLETE_PAGE_SIZE,
+    max_entries=int(os.getenv("AUTOCOMPLETE_CACHE_MAX_ENTRIES", "5000")),
+    ttl_s=10 * 60,
+)
+
+# place_id is stable, so details are kept long and refreshed in the background
+PLACE_DETAILS_TTL = 90 * 24 * 60 * 60
+PLACE_DETAILS_REFRESH_AFTER = 7 * 24 * 60 * 60
+PLACE_DETAILS_CACHE = SQLiteCache(
+    "place_details",
+    max_rows=int(os.getenv("PLACE_DETAILS_CACHE_MAX_ENTRIES", "50000")),
+)
+_PLACE_DETAILS_REFRESHING: set = set()
+
+# Sakayan terminals move slowly: searches are snapped to a grid cell (1/8 of the
+# search radius) and cached per cell, kind and radius so overlapping routes reuse them
+TRANSPORT_CACHE_TTL = 6 * 60 * 60
+TRANSPORT_CACHE = TTLCache(
+    max_entries=int(os.getenv("TRANSPORT_CACHE_MAX_ENTRIES", "5000")),
+    ttl_s=TRANSPORT_CACHE_TTL,
+)
+
+# Surveyed / OSM terminals answer transport searches locally; Places is only the
+# fallback where the index has fewer than TERMINAL_INDEX_MIN_RESULTS of a kind
+TERMINAL_INDEX = load_terminal_index()
+TERMINAL_INDEX_MIN_RESULTS = int(os.getenv("TERMINAL_INDEX_MIN_RESULTS", "2"))
+
+# Every Nearby Search result (landmark and sakayan) lands here; queries in a tile
+# another user's search already covered are answered without calling Places
+POI_STORE = PoiStore()
+POI_TRANSPORT_MIN_RESULTS = int(os.getenv("POI_TRANSPORT_MIN_RESULTS", "2"))
+
+# strong refs so fire-and-forget refresh tasks are not garbage collected mid-flight
+_BACKGROUND_TASKS: set = set()
+
+
+def _spawn_background(coro) -> None:
+    task = asyncio.create_task(coro)
+    _BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_BACKGROUND_TASKS.discard)
+
+
+def _get_maps_http_client() -> httpx.AsyncClient:
+    """Return a shared AsyncClient so Google Maps calls reuse TCP/TLS connections."""
+    global _MAPS_HTTP_CLIENT
+    if _MAPS_HTTP_CLIENT is None:
+        _MAPS_HTTP_CLIENT = httpx.AsyncClient(
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+            headers={"Connection": "keep-alive"},
+        )
+    return _MAPS_HTTP_CLIENT
+
+
+async def _request_with_retries_async(url: str, params: dict, timeout: float = 6.0, retries: int = 2, backoff: float = 0.3):
+    """
+    GET `url` and return its JSON, retrying transient errors with exponential backoff
+    on the shared keep-alive client; backoff never blocks a worker.
+    Concurrent calls with the same url and params await a single upstream request and share its JSON,
+    so callers must treat the returned dict as read-only.
+    """
+    async def _fetch():
+        client = _get_maps_http_client()
+        for attempt in range(retries + 1):
+            try:
+                resp = await client.get(url, params=params, timeout=timeout)
+                resp.raise_for_status()
+                return resp.json()
+            except httpx.HTTPError:
+                if attempt < retries:
+                    await asyncio.sleep(backoff * (2 ** attempt))
+                else:
+                    raise
+
+    key = (url, tuple(sorted((k, str(v)) for k, v in params.items() if v is not None)))
+    return await MAPS_SINGLE_FLIGHT.do(key, _fetch)
 
 # -----------------------------------------------------------
 # helpers
@@ -98,21 +213,170 @@ def _parse_latlng(value: Union[str, Dict[str, float], None]) -> Optional[Dict[st
     return None
 
 
-def _haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
-    """Compute straight-line distance in meters between two coordinates."""
-    import math
+TRANSPORT_SEARCH_PLAN = [
+    {"kind": "jeep", "keyword": "jeepney terminal", "type": "transit_station"},
+    {"kind": "trike", "keyword": "tricycle terminal", "type": "transit_station"},
+    {"kind": "bus", "keyword": "bus station", "type": "bus_station"},
+]
+
+
+def _transport_radius(radius_m: int) -> int:
+    return int(max(200, min(radius_m, 3000)))
+
+
+def _transport_search_params(center: Dict[str, float], search: Dict[str, str], radius_m: int) -> dict:
+    return {
+        "key": GOOGLE_MAPS_SERVER_KEY,
+        "location": f"{center['lat']},{center['lng']}",
+        "radius": _transport_radius(radius_m),
+        "keyword": search["keyword"],
+        "type": search["type"],
+    }
+
+
+def _transport_search_cell(center: Dict[str, float], search: Dict[str, str], radius_m: int):
+    """Return (cache key, snapped search center) for one kind of sakayan search."""
+    radius = _transport_radius(radius_m)
+    cell_m = max(50.0, radius / 8.0)
+    cell = grid_cell(center["lat"], center["lng"], cell_m)
+    lat, lng = cell_center(cell, cell_m)
+    return (cell, search["kind"], radius), {"lat": lat, "lng": lng}
+
+
+def _transport_rows(data: dict, search: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Normalize one Nearby Search response into sakayan rows (no origin distance yet)."""
+    if data.get("status") not in {"OK", "ZERO_RESULTS"}:
+        return []
 
-    r = 6371000.0
-    p1 = math.radians(lat1)
-    p2 = math.radians(lat2)
-    dp = math.radians(lat2 - lat1)
-    dl = math.radians(lng2 - lng1)
+    rows = []
+    for result in data.get("results", []):
+        place_id = result.get("place_id")
+        if not place_id:
+            continue
+
+        loc = result.get("geometry", {}).get("location", {})
+        lat = loc.get("lat")
+        lng = loc.get("lng")
+        if lat is None or lng is None:
+            continue
+
+        rows.append({
+            "place_id": place_id,
+            "kind": search["kind"],
+            "name": result.get("name") or search["keyword"],
+            "address": result.get("vicinity") or result.get("formatted_address"),
+            "lat": float(lat),
+            "lng": float(lng),
+        })
+    return rows
 
-    a = math.sin(dp / 2.0) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2.0) ** 2
-    return r * 2.0 * math.atan2(math.sqrt(a), math.sqrt(1.0 - a))
 
+def _collect_transport_results(
+    rows: List[Dict[str, Any]],
+    origin_coords: Optional[Dict[str, float]],
+    seen_place_ids: set,
+    collected: List[Dict[str, Any]],
+) -> None:
+    """Append copies of cached rows with their distance from origin, skipping duplicates."""
+    for row in rows:
+        if row["place_id"] in seen_place_ids:
+            continue
 
-def find_transport_spots(
+        seen_place_ids.add(row["place_id"])
+        entry = dict(row)
+
+        if origin_coords:
+            entry["distance_from_origin_m"] = round(
+                haversine_m(origin_coords["lat"], origin_coords["lng"], entry["lat"], entry["lng"])
+            )
+
+        collected.append(entry)
+
+
+def _nearest_transport_spots(collected: List[Dict[str, Any]], max_results: int) -> List[Dict[str, Any]]:
+    if not collected:
+        return []
+
+    collected.sort(key=lambda row: row.get("distance_from_origin_m", 10**9))
+    return collected[:max_results]
+
+
+def _local_transport_rows(center: Dict[str, float], search: Dict[str, str], radius_m: int) -> Optional[List[Dict[str, Any]]]:
+    """Rows from the offline terminal index, or None when local coverage is too thin."""
+    rows = TERMINAL_INDEX.within(search["kind"], center["lat"], center["lng"], _transport_radius(radius_m))
+    if len(rows) < TERMINAL_INDEX_MIN_RESULTS:
+        return None
+    for row in rows:
+        row.pop("distance_m", None)
+    return rows
+
+
+def _stored_transport_rows(center: Dict[str, float], search: Dict[str, str], radius_m: int) -> Optional[List[Dict[str, Any]]]:
+    """Rows from places other searches stored for this tile, or None when it is stale or thin."""
+    family = f"transport:{search['kind']}"
+    pois = POI_STORE.query(
+        center["lat"], center["lng"], _transport_radius(radius_m),
+        family=family, tag=family, min_results=POI_TRANSPORT_MIN_RESULTS,
+    )
+    if pois is None:
+        return None
+    return [
+        {
+            "place_id": poi["place_id"],
+            "kind": search["kind"],
+            "name": poi.get("name") or search["keyword"],
+            "address": poi.get("vicinity"),
+            "lat": poi["lat"],
+            "lng": poi["lng"],
+        }
+        for poi in pois
+    ]
+
+
+def _cached_transport_rows(center: Dict[str, float], search: Dict[str, str], radius_m: int):
+    """Return (rows or None, cache key, snapped center): local index, answer cache, then POI store."""
+    local = _local_transport_rows(center, search, radius_m)
+    if local is not None:
+        return local, None, None
+
+    key, snapped = _transport_search_cell(center, search, radius_m)
+    cached = TRANSPORT_CACHE.get(key)
+    if cached is not None:
+        return cached, key, snapped
+
+    stored = _stored_transport_rows(center, search, radius_m)
+    if stored is not None:
+        TRANSPORT_CACHE.set(key, stored)
+    return stored, key, snapped
+
+
+def _store_transport(key, snapped: Dict[str, float], search: Dict[str, str], radius_m: int, data: dict) -> List[Dict[str, Any]]:
+    rows = _transport_rows(data, search)
+    if data.get("status") in {"OK", "ZERO_RESULTS"}:
+        TRANSPORT_CACHE.set(key, rows)
+        family = f"transport:{search['kind']}"
+        POI_STORE.ingest(
+            data.get("results", []), snapped["lat"], snapped["lng"], _transport_radius(radius_m),
+            family=family, tag=family,
+        )
+    return rows
+
+
+async def _search_transport_kind_async(center: Dict[str, float], search: Dict[str, str], radius_m: int) -> List[Dict[str, Any]]:
+    rows, key, snapped = _cached_transport_rows(center, search, radius_m)
+    if rows is not None:
+        return rows
+
+    try:
+        data = await _request_with_retries_async(PLACES_NEARBY_URL, _transport_search_params(snapped, search, radius_m), timeout=6.0, retries=1)
+    except Exception as e:
+        print(f"[maps_client] Transport nearby search failed: {e}")
+        return []
+
+    return _store_transport(key, snapped, search, radius_m, data)
+
+
+async def find_transport_spots_async(
     origin: Union[str, Dict[str, float]],
     destination: Union[str, Dict[str, float]],
     radius_m: int = 1200,
@@ -120,113 +384,63 @@ def find_transport_spots(
 ) -> List[Dict[str, Any]]:
     """
     Detect nearby sakayan spots (jeep, tricycle, bus) around origin/destination.
-    Returns a normalized list sorted by nearest to origin.
+    Returns a normalized list sorted by nearest to origin. Both endpoints are
+    geocoded together and every center x kind search runs concurrently.
     """
-    origin_coords = _parse_latlng(origin)
-    destination_coords = _parse_latlng(destination)
-
-    if origin_coords is None and isinstance(origin, str):
-        origin_coords = get_place_coordinates(origin)
+    async def _resolve(value):
+        coords = _parse_latlng(value)
+        if coords is None and isinstance(value, str):
+            coords = await get_place_coordinates_async(value)
+        return coords
 
-    if destination_coords is None and isinstance(destination, str):
-        destination_coords = get_place_coordinates(destination)
-
-    if not origin_coords and not destination_coords:
-        return []
+    origin_coords, destination_coords = await asyncio.gather(_resolve(origin), _resolve(destination))
 
     centers = [c for c in [origin_coords, destination_coords] if c]
     if not centers:
         return []
 
-    search_plan = [
-        {"kind": "jeep", "keyword": "jeepney terminal", "type": "transit_station"},
-        {"kind": "trike", "keyword": "tricycle terminal", "type": "transit_station"},
-        {"kind": "bus", "keyword": "bus station", "type": "bus_station"},
-    ]
+    searches = [(center, search) for center in centers for search in TRANSPORT_SEARCH_PLAN]
+    results = await asyncio.gather(
+        *(_search_transport_kind_async(center, search, radius_m) for center, search in searches)
+    )
 
     seen_place_ids = set()
     collected: List[Dict[str, Any]] = []
+    # merge in plan order so duplicates resolve the same way as the sequential version
+    for rows in results:
+        _collect_transport_results(rows, origin_coords, seen_place_ids, collected)
 
-    for center in centers:
-        for search in search_plan:
-            params = {
-                "key": GOOGLE_MAPS_SERVER_KEY,
-                "location": f"{center['lat']},{center['lng']}",
-                "radius": int(max(200, min(radius_m, 3000))),
-                "keyword": search["keyword"],
-                "type": search["type"],
-            }
-            try:
-                data = _request_with_retries(PLACES_NEARBY_URL, params, timeout=6.0, retries=1)
-            except Exception as e:
-                print(f"[maps_client] Transport nearby search failed: {e}")
-                continue
-
-            if data.get("status") not in {"OK", "ZERO_RESULTS"}:
-                continue
-
-            for result in data.get("results", []):
-                place_id = result.get("place_id")
-                if not place_id or place_id in seen_place_ids:
-                    continue
-
-                loc = result.get("geometry", {}).get("location", {})
-                lat = loc.get("lat")
-                lng = loc.get("lng")
-                if lat is None or lng is None:
-                    continue
-
-                seen_place_ids.add(place_id)
-                entry = {
-                    "place_id": place_id,
-                    "kind": search["kind"],
-                    "name": result.get("name") or search["keyword"],
-                    "address": result.get("vicinity") or result.get("formatted_address"),
-                    "lat": float(lat),
-                    "lng": float(lng),
-                }
-
-                if origin_coords:
-                    entry["distance_from_origin_m"] = round(
-                        _haversine_m(origin_coords["lat"], origin_coords["lng"], entry["lat"], entry["lng"])
-                    )
-
-                collected.append(entry)
-
-    if not collected:
-        return []
-
-    collected.sort(key=lambda row: row.get("distance_from_origin_m", 10**9))
-    return collected[:max_results]
+    remember_places(collected)
+    return _nearest_transport_spots(collected, max_results)
 
 
 # -----------------------------------------------------------
 # 1) GET COORDINATES (GEOCODING)
 # -----------------------------------------------------------
-def get_place_coordinates(place_name: str, timeout: float = 6.0) -> Optional[Dict[str, float]]:
-    """
-    Geocode a freeform address/place string and return {'lat': float, 'lng': float}
-    Returns None when no result or on error.
-    """
-    params = {"address": place_name, "key": GOOGLE_MAPS_SERVER_KEY}
-    try:
-        data = _request_with_retries(GEOCODE_URL, params, timeout=timeout)
-    except Exception as e:
-        print(f"[maps_client] Geocode request error: {e}")
-        return None
+def _normalize_query_text(text: str) -> str:
+    """Fold case, accents, punctuation and whitespace so equivalent spellings share a key."""
+    folded = unicodedata.normalize("NFKD", text or "")
+    folded = "".join(ch for ch in folded if not unicodedata.combining(ch)).lower()
+    folded = re.sub(r"[^\w\s]", " ", folded)
+    return re.sub(r"\s+", " ", folded).strip()
+
 
-    # debug output — keep temporarily when testing
-    print("[maps_client] Google Geocode response status:", data.get("status"))
+def _geocode_cache_key(place_name: str) -> str:
+    key = _normalize_query_text(place_name)
+    key = re.sub(r"(\s+(metro manila|philippines))+$", "", key)
+    return PLACE_QUERY_ALIASES.get(key, key)
 
+
+def _parse_geocode(data: dict) -> Optional[Dict[str, float]]:
     status = data.get("status")
     if status != "OK":
-        # if ZERO_RESULTS or OVER_QUERY_LIMIT etc. return None
-        print(f"[maps_client] Geocode status: {status}, error_message: {data.get('error_message')}")
+        # ZERO_RESULTS is an ordinary miss; OVER_QUERY_LIMIT etc. are worth logging
+        if status != "ZERO_RESULTS":
+            print(f"[maps_client] Geocode status: {status}, error_message: {data.get('error_message')}")
         return None
 
     results = data.get("results", [])
     if not results:
-        print("[maps_client] No results in geocode response")
         return None
 
     coords = _coords_from_result(results[0])
@@ -237,31 +451,44 @@ def get_place_coordinates(place_name: str, timeout: float = 6.0) -> Optional[Dic
     return coords
 
 
+def _store_geocode(key: str, data: dict, coords: Optional[Dict[str, float]]) -> None:
+    """Persist hits and ZERO_RESULTS; transient API errors are never cached."""
+    if coords is not None:
+        GEOCODE_CACHE.set(key, coords, GEOCODE_TTL)
+    elif data.get("status") == "ZERO_RESULTS":
+        GEOCODE_CACHE.set(key, None, GEOCODE_NEGATIVE_TTL)
+
+
+async def get_place_coordinates_async(place_name: str, timeout: float = 6.0) -> Optional[Dict[str, float]]:
+    """
+    Geocode a freeform address/place string and return {'lat': float, 'lng': float}
+    Returns None when no result or on error.
+    """
+    key = _geocode_cache_key(place_name)
+    found, cached, _ = GEOCODE_CACHE.lookup(key)
+    if found:
+        return cached
+
+    params = {"address": place_name, "key": GOOGLE_MAPS_SERVER_KEY}
+    try:
+        data = await _request_with_retries_async(GEOCODE_URL, params, timeout=timeout)
+    except Exception as e:
+        print(f"[maps_client] Geocode request error: {e}")
+        return None
+
+    coords = _parse_geocode(data)
+    _store_geocode(key, data, coords)
+    return coords
+
+
 # -----------------------------------------------------------
 # 2) GET DIRECTIONS (ROUTING)
 # -----------------------------------------------------------
-def get_directions(origin: Union[str, Dict[str, float]],
-                   destination: Union[str, Dict[str, float]],
-                   mode: str = "walking",
-                   timeout: float = 6.0) -> Optional[Dict[str, Any]]:
-    """
-    BEST VERSION: normalized route with coordinates for EVERY step.
-    {
-        "polyline": "...",
-        "distance": {"text": "...", "value": ...},
-        "duration": {"text": "...", "value": ...},
-        "destination": {"lat": ..., "lng": ...},
-        "steps": [
-           {
-              "instruction": "Turn left",
-              "lat": 14.6, "lng": 120.98,
-              "distance": {...},
-              "duration": {...}
-           },
-           ...
-        ]
-    }
-    """
+def _directions_params(origin: Union[str, Dict[str, float]],
+                       destination: Union[str, Dict[str, float]],
+                       mode: str,
+                       language: str = "en",
+                       region: Optional[str] = None) -> dict:
     if mode not in {"walking", "driving", "transit", "bicycling"}:
         mode = "walking"
 
@@ -272,15 +499,73 @@ def get_directions(origin: Union[str, Dict[str, float]],
         "key": GOOGLE_MAPS_SERVER_KEY,
         "units": "metric",
         "alternatives": "false",
-        "language": "en",
+        "language": language,
     }
+    if region:
+        params["region"] = region
+    return params
+
+
+def _directions_location_key(loc: str):
+    """Snap 'lat,lng' endpoints to a grid cell; normalize free-text endpoints."""
+    coords = _parse_latlng(loc)
+    if coords:
+        return grid_cell(coords["lat"], coords["lng"], DIRECTIONS_CACHE_CELL_M)
+    return re.sub(r"\s+", " ", loc).strip().lower()
+
+
+def _directions_cache_key(params: dict) -> tuple:
+    return (
+        _directions_location_key(params["origin"]),
+        _directions_location_key(params["destination"]),
+        params["mode"],
+        params.get("language"),
+        params.get("region"),
+    )
 
+
+def _store_directions(key: tuple, params: dict, data: dict) -> None:
+    if data.get("status") != "OK":
+        return
+    ttl = DIRECTIONS_TTL_BY_MODE.get(params["mode"], 5 * 60)
+    DIRECTIONS_CACHE.set(key, data, ttl_s=ttl, stale_s=ttl)
+
+
+async def _refresh_directions_async(key: tuple, params: dict, timeout: float) -> None:
     try:
-        data = _request_with_retries(DIRECTIONS_URL, params, timeout=timeout)
+        _store_directions(key, params, await _request_with_retries_async(DIRECTIONS_URL, params, timeout=timeout))
     except Exception as e:
-        print(f"[maps_client] Directions request failed: {e}")
-        return None
+        print(f"[maps_client] Directions background refresh failed: {e}")
+    finally:
+        DIRECTIONS_CACHE.end_refresh(key)
+
 
+async def fetch_directions_data_async(params: dict, timeout: float = 6.0) -> dict:
+    """Raw Directions API response for `params`, served from DIRECTIONS_CACHE when possible; stale entries refresh in a background task."""
+    key = _directions_cache_key(params)
+    state, data = DIRECTIONS_CACHE.lookup(key)
+    if state == FRESH:
+        return data
+    if state == STALE:
+        if DIRECTIONS_CACHE.begin_refresh(key):
+            _spawn_background(_refresh_directions_async(key, params, timeout))
+        return data
+
+    data = await _request_with_retries_async(DIRECTIONS_URL, params, timeout=timeout)
+    _store_directions(key, params, data)
+    return data
+
+
+class DirectionsError(Exception):
+    """Raised by fetch_route_async; `code` is FETCH_FAILED, API_STATUS or PARSE_FAILED."""
+
+    def __init__(self, code: str, message: str, status: Optional[str] = None):
+        super().__init__(message)
+        self.code = code
+        self.status = status
+
+
+def _parse_directions(data: dict, mode: Optional[str] = None) -> Optional[Dict[str, Any]]:
     status = data.get("status")
     if status != "OK":
         print(f"[maps_client] Directions API error: {status}, msg={data.get('error_message')}")
@@ -353,9 +638,8 @@ def get_directions(origin: Union[str, Dict[str, float]],
 
             if pts:
                 try:
-                    import polyline as poly_mod  # pip install polyline OR use internal
-                    coords = poly_mod.decode(pts)
-                    if coords:
+                    coords = decode_polyline(pts)
+                    if len(coords):
                         lat = coords[-1][0]
                         lng = coords[-1][1]
                 except Exception as e:
@@ -365,10 +649,15 @@ def get_directions(origin: Union[str, Dict[str, float]],
         lat_f = float(lat) if lat is not None else None
         lng_f = float(lng) if lng is not None else None
 
+        step_poly = s.get("polyline")
         parsed_steps.append({
             "instruction": instr,
+            "maneuver": s.get("maneuver"),
             "lat": lat_f,
             "lng": lng_f,
+            "start_location": s.get("start_location"),
+            "end_location": s.get("end_location"),
+            "polyline": step_poly.get("points") if isinstance(step_poly, dict) else step_poly,
             "distance": {"text": step_dist.get("text"), "value": step_dist.get("value")},
             "duration": {"text": step_dur.get("text"), "value": step_dur.get("value")},
         })
@@ -390,20 +679,68 @@ def get_directions(origin: Union[str, Dict[str, float]],
         "end_address": leg.get("end_address"),
         "destination": destination_coords,
         "steps": parsed_steps,
+        "mode": mode,
     }
 
     return normalized
 
 
+async def fetch_route_async(origin: Union[str, Dict[str, float]],
+                            destination: Union[str, Dict[str, float]],
+                            mode: str = "walking",
+                            language: str = "en",
+                            region: Optional[str] = None,
+                            timeout: float = 6.0) -> Dict[str, Any]:
+    """
+    The one directions pipeline behind /route and /reroute: a single (cached,
+    coalesced, retried) Directions request parsed into the normalized route
+    model, with coordinates for EVERY step. Raises DirectionsError on failure.
+    {
+        "polyline": "...",
+        "distance": {"text": "...", "value": ...},
+        "duration": {"text": "...", "value": ...},
+        "start_address": "...", "end_address": "...",
+        "destination": {"lat": ..., "lng": ...},
+        "mode": "walking",
+        "steps": [
+           {
+              "instruction": "Turn left",
+              "maneuver": "turn-left",
+              "lat": 14.6, "lng": 120.98,
+              "start_location": {...}, "end_location": {...},
+              "polyline": "...",
+              "distance": {...},
+              "duration": {...}
+           },
+           ...
+        ]
+    }
+    """
+    params = _directions_params(origin, destination, mode, language=language, region=region)
+
+    try:
+        data = await fetch_directions_data_async(params, timeout=timeout)
+    except Exception as e:
+        raise DirectionsError("FETCH_FAILED", f"Directions request failed: {e}")
+
+    status = data.get("status")
+    if status != "OK":
+        raise DirectionsError(
+            "API_STATUS",
+            f"Google Directions returned {status}: {data.get('error_message')}",
+            status=status,
+        )
+
+    route = _parse_directions(data, mode=params["mode"])
+    if route is None:
+        raise DirectionsError("PARSE_FAILED", "Unexpected directions response shape")
+    return route
+
 
 # -----------------------------------------------------------
 # 3) AUTOCOMPLETE (PLACE SUGGESTIONS)
 # -----------------------------------------------------------
-def autocomplete_place(query: str, session_token: Optional[str] = None, components: Optional[str] = "country:ph", timeout: float = 4.0) -> List[Dict[str, Any]]:
-    """
-    Returns a list of predictions: [{"description": "...", "place_id": "..."}, ...]
-    Use session_token for billing optimization when implementing on frontend.
-    """
+def _autocomplete_params(query: str, session_token: Optional[str], components: Optional[str]) -> dict:
     params = {
         "input": query,
         "key": GOOGLE_MAPS_SERVER_KEY,
@@ -412,13 +749,10 @@ def autocomplete_place(query: str, session_token: Optional[str] = None, componen
     }
     if session_token:
         params["sessiontoken"] = session_token
+    return params
 
-    try:
-        data = _request_with_retries(AUTOCOMPLETE_URL, params, timeout=timeout)
-    except Exception as e:
-        print(f"[maps_client] Autocomplete request failed: {e}")
-        return []
 
+def _parse_autocomplete(data: dict) -> List[Dict[str, Any]]:
     if data.get("status") != "OK":
         # can be ZERO_RESULTS or OVER_QUERY_LIMIT etc
         print(f"[maps_client] Autocomplete status: {data.get('status')}")
@@ -430,20 +764,43 @@ def autocomplete_place(query: str, session_token: Optional[str] = None, componen
     return preds
 
 
-# -----------------------------------------------------------
-# 4) PLACE DETAILS (from place_id -> lat/lng + formatted_address)
-# -----------------------------------------------------------
-def place_details(place_id: str, timeout: float = 4.0) -> Optional[Dict[str, Any]]:
+def _store_autocomplete(prefix: str, components: Optional[str], data: dict, preds: List[Dict[str, Any]]) -> None:
+    # only definitive answers; an error page must not look like an exhaustive empty list
+    if data.get("status") in {"OK", "ZERO_RESULTS"}:
+        AUTOCOMPLETE_CACHE.set(prefix, preds, scope=components)
+
+
+async def autocomplete_place_async(query: str, session_token: Optional[str] = None, components: Optional[str] = "country:ph", timeout: float = 4.0) -> List[Dict[str, Any]]:
     """
-    Returns {'name','address','lat','lng','phone' (if available)} or None.
+    Returns a list of predictions: [{"description": "...", "place_id": "..."}, ...]
+    Use session_token for billing optimization when implementing on frontend.
     """
-    params = {"place_id": place_id, "key": GOOGLE_MAPS_SERVER_KEY, "fields": "name,formatted_address,geometry,formatted_phone_number"}
+    prefix = _normalize_query_text(query)
+    cached = AUTOCOMPLETE_CACHE.get(prefix, scope=components)
+    if cached is not None:
+        return cached
+
+    params = _autocomplete_params(query, session_token, components)
+
     try:
-        data = _request_with_retries(PLACE_DETAILS_URL, params, timeout=timeout)
+        data = await _request_with_retries_async(AUTOCOMPLETE_URL, params, timeout=timeout)
     except Exception as e:
-        print(f"[maps_client] Place details request failed: {e}")
-        return None
+        print(f"[maps_client] Autocomplete request failed: {e}")
+        return []
+
+    preds = _parse_autocomplete(data)
+    _store_autocomplete(prefix, components, data, preds)
+    return preds
+
+
+# -----------------------------------------------------------
+# 4) PLACE DETAILS (from place_id -> lat/lng + formatted_address)
+# -----------------------------------------------------------
+def _place_details_params(place_id: str) -> dict:
+    return {"place_id": place_id, "key": GOOGLE_MAPS_SERVER_KEY, "fields": "name,formatted_address,geometry,formatted_phone_number"}
+
 
+def _parse_place_details(data: dict) -> Optional[Dict[str, Any]]:
     if data.get("status") != "OK":
         print(f"[maps_client] Place details status: {data.get('status')}")
         return None
@@ -457,3 +814,83 @@ def place_details(place_id: str, timeout: float = 4.0) -> Optional[Dict[str, Any
         "lng": loc.get("lng"),
         "phone": result.get("formatted_phone_number")
     }
+
+
+def remember_places(results: List[Dict[str, Any]]) -> None:
+    """
+    Seed the place-details store from Nearby Search results, which already carry
+    place_id, name and coordinates. Such entries are marked partial (no phone,
+    vicinity instead of formatted address) and never overwrite a full entry.
+    """
+    items = {}
+    for result in results:
+        if result.get("source") == "local":
+            continue  # not a Google place_id
+        place_id = result.get("place_id")
+        coords = _coords_from_result(result) if "geometry" in result else _parse_latlng(result)
+        if not place_id or not coords:
+            continue
+        items[place_id] = {
+            "place": {
+                "name": result.get("name"),
+                "address": result.get("formatted_address") or result.get("vicinity") or result.get("address"),
+                "lat": coords["lat"],
+                "lng": coords["lng"],
+                "phone": None,
+            },
+            "complete": False,
+        }
+
+    try:
+        PLACE_DETAILS_CACHE.set_many(items, PLACE_DETAILS_TTL, replace=False)
+    except Exception as e:
+        print(f"[maps_client] Could not store place details: {e}")
+
+
+def _cached_place_details(place_id: str):
+    """Return (place or None, needs_refresh)."""
+    found, entry, stored_at = PLACE_DETAILS_CACHE.lookup(place_id)
+    if not found:
+        return None, False
+    needs_refresh = not entry.get("complete") or time.time() - stored_at > PLACE_DETAILS_REFRESH_AFTER
+    if needs_refresh and place_id in _PLACE_DETAILS_REFRESHING:
+        needs_refresh = False
+    return entry["place"], needs_refresh
+
+
+def _store_place_details(place_id: str, details: Optional[Dict[str, Any]]) -> None:
+    if details is not None:
+        PLACE_DETAILS_CACHE.set(place_id, {"place": details, "complete": True}, PLACE_DETAILS_TTL)
+
+
+async def _refresh_place_details_async(place_id: str, timeout: float) -> None:
+    try:
+        data = await _request_with_retries_async(PLACE_DETAILS_URL, _place_details_params(place_id), timeout=timeout)
+        _store_place_details(place_id, _parse_place_details(data))
+    except Exception as e:
+        print(f"[maps_client] Place details background refresh failed: {e}")
+    finally:
+        _PLACE_DETAILS_REFRESHING.discard(place_id)
+
+
+async def place_details_async(place_id: str, timeout: float = 4.0) -> Optional[Dict[str, Any]]:
+    """
+    Returns {'name','address','lat','lng','phone' (if available)} or None.
+    """
+    cached, needs_refresh = _cached_place_details(place_id)
+    if cached is not None:
+        if needs_refresh:
+            _PLACE_DETAILS_REFRESHING.add(place_id)
+            _spawn_background(_refresh_place_details_async(place_id, timeout))
+        return cached
+
+    params = _place_details_params(place_id)
+    try:
+        data = await _request_with_retries_async(PLACE_DETAILS_URL, params, timeout=timeout)
+    except Exception as e:
+        print(f"[maps_client] Place details request failed: {e}")
+        return None
+
+    details = _parse_place_details(data)
+    _store_place_details(place_id, details)
+    return details
@@ -0,0 +1,91 @@
+# backend/utils/mp3.py
+from typing import List, Sequence, Tuple
+
+# Layer III bitrates (kbps) by bitrate index; MPEG-2 and 2.5 share a table
+_BITRATES_V1 = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+_BITRATES_V2 = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+# sample rates by version bits (0 = MPEG-2.5, 2 = MPEG-2, 3 = MPEG-1)
+_SAMPLE_RATES = {0: (11025, 12000, 8000), 2: (22050, 24000, 16000), 3: (44100, 48000, 32000)}
+
+Mp3Format = Tuple[int, int, int]  # (version bits, sample rate, channels)
+
+
+def _id3v2_size(data: bytes) -> int:
+    """Length of a leading ID3v2 tag (header, body and optional footer), 0 if none."""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _parse_header(data: bytes, pos: int):
+    """(frame length, format, side-info length) of the Layer III frame at pos, or None."""
+    if pos + 4 > len(data) or data[pos] != 0xFF or data[pos + 1] & 0xE0 != 0xE0:
+        return None
+    b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+    version = (b1 >> 3) & 0x03
+    layer = (b1 >> 1) & 0x03
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 0x03
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 0x01
+    channels = 1 if b3 >> 6 == 3 else 2
+    if version == 3:
+        length = 144000 * _BITRATES_V1[bitrate_index] // sample_rate + padding
+        side_info = 17 if channels == 1 else 32
+    else:
+        length = 72000 * _BITRATES_V2[bitrate_index] // sample_rate + padding
+        side_info = 9 if channels == 1 else 17
+    return length, (version, sample_rate, channels), side_info
+
+
+def mp3_frames(data: bytes) -> Tuple[bytes, Mp3Format]:
+    """
+    The audio frames of an MP3 file with its ID3 tags and Xing/Info/VBRI
+    header frame removed, so several files can be joined into one stream.
+    Raises ValueError if no Layer III frames are found or formats change.
+    """
+    pos = _id3v2_size(data)
+    frames: List[bytes] = []
+    fmt = None
+    while True:
+        header = _parse_header(data, pos)
+        if header is None:
+            break  # trailing ID3v1/APE tag, junk or end of data
+        length, frame_fmt, side_info = header
+        if pos + length > len(data):
+            break  # truncated last frame
+        if fmt is None:
+            fmt = frame_fmt
+            body = pos + 4 + side_info
+            if data[body:body + 4] in (b"Xing", b"Info") or data[pos + 36:pos + 40] == b"VBRI":
+                pos += length
+                continue
+        elif frame_fmt != fmt:
+            raise ValueError(f"MP3 format changes mid-stream: {fmt} -> {frame_fmt}")
+        frames.append(data[pos:pos + length])
+        pos += length
+
+    if fmt is None or not frames:
+        raise ValueError("no MPEG Layer III frames found")
+    return b"".join(frames), fmt
+
+
+def concat_mp3(parts: Sequence[bytes]) -> bytes:
+    """Frame-level concatenation of MP3 files that share sample rate and channel layout."""
+    joined: List[bytes] = []
+    fmt = None
+    for part in parts:
+        frames, part_fmt = mp3_frames(part)
+        if fmt is None:
+            fmt = part_fmt
+        elif part_fmt != fmt:
+            raise ValueError(f"cannot join MP3 formats {fmt} and {part_fmt}")
+        joined.append(frames)
+    if not joined:
+        raise ValueError("nothing to join")
+    return b"".join(joined)
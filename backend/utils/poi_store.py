@@ -0,0 +1,219 @@
+# backend/utils/poi_store.py
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from utils.geo_cache import METERS_PER_DEG_LAT, Cell, grid_cell, haversine_m, neighbor_cells
+
+POI_TILE_M = float(os.getenv("POI_TILE_M", "100"))
+# Freshness is tracked on a grid sized to each search family's radius: small
+# for 60 m landmark searches, coarse for kilometre-wide sakayan searches
+COVERAGE_TILE_M = {
+    "landmark": float(os.getenv("POI_LANDMARK_TILE_M", "40")),
+    "transport": float(os.getenv("POI_TRANSPORT_TILE_M", "400")),
+}
+POI_TTL = float(os.getenv("POI_TTL_S", str(24 * 60 * 60)))  # 1 day
+POI_MAX_ENTRIES = int(os.getenv("POI_MAX_ENTRIES", "100000"))
+POI_MAX_COVERAGE = int(os.getenv("POI_MAX_COVERAGE", "200000"))
+
+POI_FIELDS = ("place_id", "name", "types", "rating", "user_ratings_total", "vicinity")
+
+
+def _poi_from_result(result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Project a Nearby Search result (or a normalized sakayan row) onto the stored fields."""
+    place_id = result.get("place_id")
+    if not place_id:
+        return None
+    loc = (result.get("geometry") or {}).get("location") or result
+    lat = loc.get("lat")
+    lng = loc.get("lng")
+    if lat is None or lng is None:
+        return None
+
+    poi = {field: result.get(field) for field in POI_FIELDS}
+    poi["types"] = list(result.get("types") or [])
+    poi["vicinity"] = result.get("vicinity") or result.get("address")
+    poi["lat"] = float(lat)
+    poi["lng"] = float(lng)
+    return poi
+
+
+class PoiStore:
+    """
+    Process-wide store of places seen in Nearby Search responses, bucketed
+    into POI_TILE_M tiles. Every completed search also stamps the coverage
+    tiles it covered for its search family ("landmark", "transport:jeep", ...),
+    so a later query anywhere in a fresh tile can be answered from stored
+    places, whichever user's search put them there.
+    """
+
+    def __init__(self, tile_m: float = POI_TILE_M, ttl_s: float = POI_TTL,
+                 max_entries: int = POI_MAX_ENTRIES, max_coverage: int = POI_MAX_COVERAGE):
+        self.tile_m = tile_m
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.max_coverage = max_coverage
+        self._pois: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._tiles: Dict[Cell, Set[str]] = {}
+        self._coverage: "OrderedDict[tuple[Cell, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.ingested = 0
+        self.hits = 0
+        self.thin = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _coverage_tile_m(self, family: str) -> float:
+        return COVERAGE_TILE_M.get(family.split(":", 1)[0], self.tile_m)
+
+    def _covered_tiles(self, lat: float, lng: float, radius_m: float, tile_m: float) -> Iterable[Cell]:
+        """The tile containing the center plus every tile whose center lies inside the circle."""
+        rings = max(1, math.ceil(radius_m / tile_m))
+        lat_step = tile_m / METERS_PER_DEG_LAT
+        first = True
+        for cell in neighbor_cells(lat, lng, tile_m, rings):
+            if first:
+                first = False
+                yield cell
+                continue
+            row, col = cell
+            tile_lat = (row + 0.5) * lat_step
+            lng_step = lat_step / max(math.cos(math.radians(tile_lat)), 1e-6)
+            if haversine_m(lat, lng, tile_lat, (col + 0.5) * lng_step) <= radius_m:
+                yield cell
+
+    def _drop_locked(self, place_id: str) -> Dict[str, Any]:
+        poi = self._pois.pop(place_id)
+        tile = grid_cell(poi["lat"], poi["lng"], self.tile_m)
+        members = self._tiles.get(tile)
+        if members is not None:
+            members.discard(place_id)
+            if not members:
+                del self._tiles[tile]
+        return poi
+
+    def _put_locked(self, poi: Dict[str, Any], tag: Optional[str], now: float) -> None:
+        place_id = poi["place_id"]
+        existing = self._drop_locked(place_id) if place_id in self._pois else None
+        tags = set(existing["tags"]) if existing else set()
+        if tag:
+            tags.add(tag)
+        if existing:
+            # a typed search can return a place with less detail than an earlier one
+            poi = {**existing, **{k: v for k, v in poi.items() if v not in (None, [])}}
+
+        poi["tags"] = sorted(tags)
+        poi["ts"] = now
+        self._pois[place_id] = poi
+        self._tiles.setdefault(grid_cell(poi["lat"], poi["lng"], self.tile_m), set()).add(place_id)
+
+        while len(self._pois) > self.max_entries:
+            self._drop_locked(next(iter(self._pois)))
+            self.evictions += 1
+
+    def _expire_locked(self, now: float) -> None:
+        """Drop places not seen for ttl_s; _pois is ordered by last sighting, oldest first."""
+        while self._pois:
+            place_id, poi = next(iter(self._pois.items()))
+            if now - poi["ts"] < self.ttl_s:
+                break
+            self._drop_locked(place_id)
+        while self._coverage:
+            key, ts = next(iter(self._coverage.items()))
+            if now - ts < self.ttl_s:
+                break
+            del self._coverage[key]
+
+    def ingest(self, results: Iterable[Dict[str, Any]], lat: Optional[float] = None, lng: Optional[float] = None,
+               radius_m: Optional[float] = None, family: Optional[str] = None, tag: Optional[str] = None) -> int:
+        """
+        Store every usable result. With a search center, radius and family the
+        covered tiles are also marked fresh for that family: pass those only for
+        a search that completed, so a failed one never vouches for its area.
+        """
+        now = time.time()
+        count = 0
+        with self._lock:
+            for result in results:
+                poi = _poi_from_result(result)
+                if poi is None:
+                    continue
+                self._put_locked(poi, tag, now)
+                count += 1
+            self.ingested += count
+            self._expire_locked(now)
+
+            if family and lat is not None and lng is not None and radius_m:
+                tile_m = self._coverage_tile_m(family)
+                for tile in self._covered_tiles(lat, lng, radius_m, tile_m):
+                    key = (tile, family)
+                    self._coverage[key] = now
+                    self._coverage.move_to_end(key)
+                while len(self._coverage) > self.max_coverage:
+                    self._coverage.popitem(last=False)
+        return count
+
+    def is_fresh(self, lat: float, lng: float, family: str, max_age_s: Optional[float] = None) -> bool:
+        tile = grid_cell(lat, lng, self._coverage_tile_m(family))
+        with self._lock:
+            ts = self._coverage.get((tile, family))
+        return ts is not None and time.time() - ts < self._max_age(max_age_s)
+
+    def _max_age(self, max_age_s: Optional[float]) -> float:
+        return self.ttl_s if max_age_s is None else min(self.ttl_s, max_age_s)
+
+    def query(self, lat: float, lng: float, radius_m: float, family: str, tag: Optional[str] = None,
+              min_results: int = 1, max_age_s: Optional[float] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Stored places within radius_m (nearest first, optionally only those
+        carrying `tag`), or None when the tile is stale for `family` or fewer
+        than `min_results` places are known, i.e. when Places should be asked.
+        `max_age_s` holds both the tile and its places to a shorter freshness
+        than the store's ttl_s.
+        """
+        if not self.is_fresh(lat, lng, family, max_age_s):
+            self.misses += 1
+            return None
+
+        now = time.time()
+        max_age = self._max_age(max_age_s)
+        rings = max(1, math.ceil(radius_m / self.tile_m))
+        found = []
+        with self._lock:
+            for tile in neighbor_cells(lat, lng, self.tile_m, rings):
+                for place_id in self._tiles.get(tile, ()):
+                    poi = self._pois[place_id]
+                    if now - poi["ts"] >= max_age or (tag and tag not in poi["tags"]):
+                        continue
+                    dist = haversine_m(lat, lng, poi["lat"], poi["lng"])
+                    if dist <= radius_m:
+                        found.append((dist, place_id, poi))
+
+        if len(found) < min_results:
+            self.thin += 1
+            return None
+
+        self.hits += 1
+        found.sort(key=lambda item: (item[0], item[1]))
+        return [dict(poi, distance_m=round(dist)) for dist, _, poi in found]
+
+    def __len__(self) -> int:
+        return len(self._pois)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.thin + self.misses
+        return {
+            "pois": len(self._pois),
+            "tiles": len(self._tiles),
+            "covered_tiles": len(self._coverage),
+            "max_entries": self.max_entries,
+            "ingested": self.ingested,
+            "hits": self.hits,
+            "thin": self.thin,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,80 @@
+# backend/utils/prefix_cache.py
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from utils.ttl_cache import TTLCache
+
+
+def _matches_prefix(prefix: str, text: str) -> bool:
+    """True when every word typed so far starts some word of the (normalized) text."""
+    words = text.split()
+    return all(any(word.startswith(token) for word in words) for token in prefix.split())
+
+
+class PrefixCache:
+    """
+    Typeahead cache keyed by normalized prefix. Besides exact hits, a longer
+    prefix is answered by filtering a shorter cached prefix whose result list
+    was exhaustive (shorter than the provider's page size). Only a non-empty
+    filtered list is served: the provider also matches abbreviations, aliases
+    and reordered words that a local word-prefix filter cannot see, so an
+    empty one is a miss rather than "no results".
+    """
+
+    def __init__(
+        self,
+        normalize: Callable[[str], str],
+        text_key: str,
+        page_size: int = 5,
+        max_entries: int = 5000,
+        ttl_s: float = 10 * 60,
+        min_prefix: int = 1,
+    ):
+        self.normalize = normalize
+        self.text_key = text_key
+        self.page_size = page_size
+        self.min_prefix = min_prefix
+        self._cache = TTLCache(max_entries=max_entries, ttl_s=ttl_s)
+        self.exact_hits = 0
+        self.filtered_hits = 0
+        self.misses = 0
+
+    def get(self, prefix: str, scope: Hashable = None) -> Optional[List[Dict[str, Any]]]:
+        """Return cached items for `prefix` (already normalized) or None on a miss."""
+        entry = self._cache.get((scope, prefix))
+        if entry is not None:
+            self.exact_hits += 1
+            return entry["items"]
+
+        for cut in range(len(prefix) - 1, self.min_prefix - 1, -1):
+            shorter = prefix[:cut].rstrip()
+            if not shorter:
+                break
+            entry = self._cache.get((scope, shorter))
+            if entry is None or not entry["exhaustive"]:
+                continue
+            items = [
+                item for item in entry["items"]
+                if _matches_prefix(prefix, self.normalize(item.get(self.text_key) or ""))
+            ]
+            if not items:
+                break
+            self.filtered_hits += 1
+            return items
+
+        self.misses += 1
+        return None
+
+    def set(self, prefix: str, items: List[Dict[str, Any]], scope: Hashable = None) -> None:
+        self._cache.set((scope, prefix), {"items": items, "exhaustive": len(items) < self.page_size})
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.exact_hits + self.filtered_hits + self.misses
+        return {
+            "entries": len(self._cache),
+            "max_entries": self._cache.max_entries,
+            "exact_hits": self.exact_hits,
+            "filtered_hits": self.filtered_hits,
+            "misses": self.misses,
+            "evictions": self._cache.evictions,
+            "hit_ratio": round((self.exact_hits + self.filtered_hits) / lookups, 4) if lookups else 0.0,
+        }
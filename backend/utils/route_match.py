@@ -0,0 +1,189 @@
+# backend/utils/route_match.py
+import hashlib
+import math
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from utils.geo_cache import EARTH_RADIUS_M
+from utils.geometry import decode_polyline, route_points
+from utils.ttl_cache import TTLCache
+
+# A fix further than this from every segment (or than its own accuracy, if
+# larger) counts as off the route
+OFF_ROUTE_M = float(os.getenv("OFF_ROUTE_M", "35"))
+# Fixes with a worse reported accuracy are ignored
+MAX_FIX_ACCURACY_M = float(os.getenv("OFF_ROUTE_MAX_ACCURACY_M", "60"))
+# Consecutive off-route fixes needed before a deviation is reported
+OFF_ROUTE_CONFIRM_FIXES = int(os.getenv("OFF_ROUTE_CONFIRM_FIXES", "3"))
+# Heading this far from the segment's direction marks a half-threshold fix as off
+HEADING_MISMATCH_DEG = float(os.getenv("OFF_ROUTE_HEADING_DEG", "120"))
+# Movement needed between fixes before a heading is derived from them
+MIN_HEADING_MOVE_M = 8.0
+
+# Prepared lines for polyline-only progress checks (route_id checks use route sessions)
+POLYLINE_LINE_TTL = 30 * 60  # 30 minutes
+POLYLINE_LINES = TTLCache(
+    max_entries=int(os.getenv("POLYLINE_LINE_CACHE_MAX_ENTRIES", "500")),
+    ttl_s=POLYLINE_LINE_TTL,
+)
+
+
+class RouteLine:
+    """
+    A route polyline prepared for map matching: vertices projected to local
+    meters once, with per-segment vectors, lengths, bearings and step indices
+    so every fix can be matched against all segments in one numpy pass.
+    """
+
+    def __init__(self, points: np.ndarray, step_offsets: Optional[Sequence[int]] = None):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(points) == 0:
+            raise ValueError("route has no geometry")
+        if len(points) == 1:
+            points = np.vstack((points, points))
+
+        self.points = points
+        self.ref_lat = float(points[:, 0].mean())
+        self._cos_ref = math.cos(math.radians(self.ref_lat))
+        xy = self.project(points[:, 0], points[:, 1])
+
+        self.seg_start = xy[:-1]
+        self.seg_vec = xy[1:] - xy[:-1]
+        self.seg_len2 = np.einsum("ij,ij->i", self.seg_vec, self.seg_vec)
+        seg_len = np.sqrt(self.seg_len2)
+        self.seg_offset = np.concatenate(([0.0], np.cumsum(seg_len)[:-1]))
+        self.length_m = float(seg_len.sum())
+        # compass bearing: 0 = north, clockwise
+        self.seg_bearing = np.degrees(np.arctan2(self.seg_vec[:, 0], self.seg_vec[:, 1])) % 360.0
+
+        self.step_count = len(step_offsets) if step_offsets else 0
+        if step_offsets:
+            seg_index = np.arange(len(self.seg_vec))
+            self.seg_step = np.searchsorted(np.asarray(step_offsets), seg_index, side="right") - 1
+            self.seg_step = np.clip(self.seg_step, 0, self.step_count - 1)
+        else:
+            self.seg_step = None
+
+    @classmethod
+    def from_route(cls, route: Dict[str, Any]) -> "RouteLine":
+        points, offsets = route_points(route)
+        return cls(points, offsets)
+
+    @classmethod
+    def from_polyline(cls, encoded: str) -> "RouteLine":
+        return cls(decode_polyline(encoded))
+
+    def project(self, lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+        return np.column_stack((
+            np.radians(lng) * self._cos_ref * EARTH_RADIUS_M,
+            np.radians(lat) * EARTH_RADIUS_M,
+        ))
+
+    def unproject(self, xy: np.ndarray) -> np.ndarray:
+        return np.column_stack((
+            np.degrees(xy[:, 1] / EARTH_RADIUS_M),
+            np.degrees(xy[:, 0] / (EARTH_RADIUS_M * self._cos_ref)),
+        ))
+
+    def locate(self, lat: np.ndarray, lng: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Nearest segment for each fix, computed fix x segment at once:
+        cross-track distance, along-track progress, segment bearing and the
+        snapped position.
+        """
+        p = self.project(np.asarray(lat, dtype=np.float64), np.asarray(lng, dtype=np.float64))
+        ap = p[:, None, :] - self.seg_start[None, :, :]
+        dot = np.einsum("msk,sk->ms", ap, self.seg_vec)
+        t = np.clip(np.divide(dot, self.seg_len2, out=np.zeros_like(dot), where=self.seg_len2 > 0), 0.0, 1.0)
+        offset = ap - t[:, :, None] * self.seg_vec[None, :, :]
+        dist = np.hypot(offset[:, :, 0], offset[:, :, 1])
+
+        rows = np.arange(len(p))
+        seg = np.argmin(dist, axis=1)
+        t_best = t[rows, seg]
+        snapped = self.seg_start[seg] + t_best[:, None] * self.seg_vec[seg]
+        return {
+            "segment": seg,
+            "cross_track_m": dist[rows, seg],
+            "progress_m": self.seg_offset[seg] + t_best * np.sqrt(self.seg_len2[seg]),
+            "bearing": self.seg_bearing[seg],
+            "snapped": self.unproject(snapped),
+        }
+
+
+def polyline_line(polyline: str) -> RouteLine:
+    """Prepare (and remember) a RouteLine for a client-supplied encoded polyline."""
+    key = hashlib.sha1(polyline.encode("utf-8")).hexdigest()[:20]
+    line = POLYLINE_LINES.get(key)
+    if line is None:
+        line = RouteLine.from_polyline(polyline)
+        POLYLINE_LINES.set(key, line)
+    return line
+
+
+def _heading_delta(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.abs((a - b + 180.0) % 360.0 - 180.0)
+
+
+def match_fixes(line: RouteLine, fixes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Classify a batch of recent GPS fixes (oldest first) against a route.
+    A deviation is only reported once the last OFF_ROUTE_CONFIRM_FIXES usable
+    fixes are all off the route, so single jittery fixes never trigger a reroute.
+    """
+    usable = [
+        f for f in fixes
+        if f.get("accuracy") is None or f["accuracy"] <= MAX_FIX_ACCURACY_M
+    ]
+    if not usable:
+        return {"status": "unknown", "reason": "no fix within accuracy limit", "fixes_used": 0}
+
+    lat = np.array([f["lat"] for f in usable], dtype=np.float64)
+    lng = np.array([f["lng"] for f in usable], dtype=np.float64)
+    accuracy = np.array([f.get("accuracy") or 0.0 for f in usable], dtype=np.float64)
+    loc = line.locate(lat, lng)
+
+    # reported heading where the device gives one, else the direction moved since the previous fix
+    heading = np.array([
+        f["heading"] if f.get("heading") is not None and f["heading"] >= 0 else np.nan
+        for f in usable
+    ], dtype=np.float64)
+    if len(usable) > 1:
+        xy = line.project(lat, lng)
+        step = np.diff(xy, axis=0)
+        moved = np.hypot(step[:, 0], step[:, 1])
+        derived = np.degrees(np.arctan2(step[:, 0], step[:, 1])) % 360.0
+        fill = np.isnan(heading[1:]) & (moved >= MIN_HEADING_MOVE_M)
+        heading[1:][fill] = derived[fill]
+
+    heading_delta = _heading_delta(heading, loc["bearing"])
+    threshold = np.maximum(OFF_ROUTE_M, accuracy)
+    wrong_way = np.nan_to_num(heading_delta, nan=0.0) > HEADING_MISMATCH_DEG
+    off = (loc["cross_track_m"] > threshold) | (wrong_way & (loc["cross_track_m"] > threshold / 2))
+
+    trailing_off = 0
+    for flag in off[::-1]:
+        if not flag:
+            break
+        trailing_off += 1
+
+    status = "off_route" if trailing_off >= OFF_ROUTE_CONFIRM_FIXES else "on_route"
+
+    last = -1
+    step_index = int(line.seg_step[loc["segment"][last]]) if line.seg_step is not None else None
+    last_heading_delta = heading_delta[last]
+    snapped = loc["snapped"][last]
+    return {
+        "status": status,
+        "step_index": step_index,
+        "distance_from_route_m": round(float(loc["cross_track_m"][last]), 1),
+        "progress_m": round(float(loc["progress_m"][last]), 1),
+        "remaining_m": round(max(0.0, line.length_m - float(loc["progress_m"][last])), 1),
+        "heading_delta_deg": None if np.isnan(last_heading_delta) else round(float(last_heading_delta), 1),
+        "snapped": {"lat": round(float(snapped[0]), 6), "lng": round(float(snapped[1]), 6)},
+        "off_route_fixes": trailing_off,
+        "confirm_fixes": OFF_ROUTE_CONFIRM_FIXES,
+        "fixes_used": len(usable),
+    }
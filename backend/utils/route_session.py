@@ -0,0 +1,220 @@
+# backend/utils/route_session.py
+import copy
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.geo_cache import haversine_m
+from utils.geometry import DEFAULT_ZOOMS, encode_polyline, route_points, simplify, zoom_tolerance_m
+from utils.route_match import RouteLine
+
+ROUTE_SESSION_TTL = float(os.getenv("ROUTE_SESSION_TTL_S", str(2 * 60 * 60)))  # idle sessions expire
+ROUTE_SESSION_MAX_ENTRIES = int(os.getenv("ROUTE_SESSION_MAX_ENTRIES", "5000"))
+ROUTE_SESSION_MAX_BYTES = int(float(os.getenv("ROUTE_SESSION_MAX_MB", "64")) * 1024 * 1024)
+
+# Rejoin the original route at the first step boundary at least this far ahead
+# of the walker's projected position, so the detour does not end behind them
+REJOIN_MIN_AHEAD_M = float(os.getenv("REROUTE_REJOIN_AHEAD_M", "60"))
+# Further than this from the original route, splicing is pointless: full reroute
+REJOIN_MAX_OFFSET_M = float(os.getenv("REROUTE_REJOIN_MAX_OFFSET_M", "400"))
+# A detour whose end Google snapped further than this from the waypoint is rejected
+REJOIN_MAX_GAP_M = 30.0
+# A /reroute destination within this of the session's counts as the same trip
+SAME_DESTINATION_M = 100.0
+
+
+class RouteSession:
+    """One client's active route: the normalized route plus its prepared RouteLine."""
+
+    def __init__(self, route_id: str, route: Dict[str, Any], language: str = "en"):
+        self.route_id = route_id
+        self.created = time.time()
+        self.revision = 0
+        self.update(route, language)
+
+    def update(self, route: Dict[str, Any], language: str) -> None:
+        self.route = route
+        # Directions language of the steps, so a spliced detour matches them
+        self.language = language
+        points, self.step_offsets = route_points(route)
+        self.line = RouteLine(points, self.step_offsets)
+        # rough resident size: the route as JSON plus the numpy arrays
+        self.size_bytes = len(json.dumps(route, default=str)) + sum(
+            arr.nbytes for arr in (self.line.points, self.line.seg_start, self.line.seg_vec)
+        ) * 2
+
+    def same_trip(self, mode: str, dest_lat: float, dest_lng: float) -> bool:
+        destination = self.route.get("destination") or {}
+        if self.route.get("mode") != mode or destination.get("lat") is None:
+            return False
+        return haversine_m(dest_lat, dest_lng, destination["lat"], destination["lng"]) <= SAME_DESTINATION_M
+
+
+class RouteSessionStore:
+    """
+    route_id -> RouteSession, LRU with a sliding idle TTL and caps on both the
+    number of sessions and their estimated total size.
+    """
+
+    def __init__(self, ttl_s: float = ROUTE_SESSION_TTL, max_entries: int = ROUTE_SESSION_MAX_ENTRIES,
+                 max_bytes: int = ROUTE_SESSION_MAX_BYTES):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sessions: "OrderedDict[str, Tuple[float, RouteSession]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.created = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _drop_locked(self, route_id: str) -> None:
+        _, session = self._sessions.pop(route_id)
+        self._bytes -= session.size_bytes
+
+    def _evict_locked(self) -> None:
+        while self._sessions and (len(self._sessions) > self.max_entries or self._bytes > self.max_bytes):
+            route_id = next(iter(self._sessions))
+            self._drop_locked(route_id)
+            self.evictions += 1
+
+    def create(self, route: Dict[str, Any], language: str = "en") -> Optional[str]:
+        """Start a session for a normalized route; returns its route_id, or None if it has no geometry."""
+        try:
+            session = RouteSession(uuid.uuid4().hex[:20], copy.deepcopy(route), language)
+        except Exception as e:
+            print(f"[route_session] Could not index route: {e}")
+            return None
+
+        with self._lock:
+            self._sessions[session.route_id] = (time.time(), session)
+            self._bytes += session.size_bytes
+            self.created += 1
+            self._evict_locked()
+        return session.route_id
+
+    def get(self, route_id: str) -> Optional[RouteSession]:
+        now = time.time()
+        with self._lock:
+            item = self._sessions.get(route_id)
+            if item is None or now - item[0] > self.ttl_s:
+                if item is not None:
+                    self._drop_locked(route_id)
+                self.misses += 1
+                return None
+            session = item[1]
+            self._sessions[route_id] = (now, session)
+            self._sessions.move_to_end(route_id)
+            self.hits += 1
+            return session
+
+    def replace(self, session: RouteSession, route: Dict[str, Any], language: Optional[str] = None) -> None:
+        """
+        Swap in a new route (e.g. after a splice or full reroute), keeping the
+        route_id; a session evicted since it was looked up is added back.
+        """
+        with self._lock:
+            if session.route_id in self._sessions:
+                self._drop_locked(session.route_id)
+            session.update(copy.deepcopy(route), language or session.language)
+            session.revision += 1
+            self._sessions[session.route_id] = (time.time(), session)
+            self._bytes += session.size_bytes
+            self._evict_locked()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "created": self.created,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+ROUTE_SESSIONS = RouteSessionStore()
+
+
+def rejoin_point(session: RouteSession, lat: float, lng: float) -> Optional[Dict[str, Any]]:
+    """
+    The nearest downstream step boundary of the session's route from lat/lng,
+    or None when the walker is too far off or too close to the end to splice.
+    """
+    if not session.step_offsets:
+        return None
+    loc = session.line.locate(np.array([lat]), np.array([lng]))
+    if float(loc["cross_track_m"][0]) > REJOIN_MAX_OFFSET_M:
+        return None
+
+    progress = float(loc["progress_m"][0])
+    # along-track distance at each step's first vertex
+    vertex_progress = np.concatenate((session.line.seg_offset, [session.line.length_m]))
+    for step_index, vertex in enumerate(session.step_offsets):
+        if vertex_progress[vertex] >= progress + REJOIN_MIN_AHEAD_M:
+            point = session.line.points[vertex]
+            return {
+                "step_index": step_index,
+                "lat": float(point[0]),
+                "lng": float(point[1]),
+                "progress_m": float(vertex_progress[vertex]),
+            }
+    return None
+
+
+def _distance_text(meters: float) -> str:
+    return f"{meters / 1000:.1f} km" if meters >= 1000 else f"{int(round(meters))} m"
+
+
+def _duration_text(seconds: float) -> str:
+    minutes = max(1, int(round(seconds / 60)))
+    if minutes < 60:
+        return f"{minutes} min" if minutes == 1 else f"{minutes} mins"
+    return f"{minutes // 60} hr {minutes % 60} min"
+
+
+def splice_route(route: Dict[str, Any], detour: Dict[str, Any], rejoin: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Detour steps followed by the original route's steps from the rejoin
+    step on; None if the detour does not actually end at the rejoin point.
+    """
+    steps: List[Dict[str, Any]] = detour.get("steps") or []
+    end = detour.get("destination") or {}
+    if not steps or end.get("lat") is None:
+        return None
+    if haversine_m(end["lat"], end["lng"], rejoin["lat"], rejoin["lng"]) > REJOIN_MAX_GAP_M:
+        return None
+
+    kept = route["steps"][rejoin["step_index"]:]
+    spliced_steps = [dict(step) for step in steps] + [dict(step) for step in kept]
+
+    distance = sum((step.get("distance") or {}).get("value") or 0 for step in spliced_steps)
+    duration = sum((step.get("duration") or {}).get("value") or 0 for step in spliced_steps)
+
+    spliced = {
+        **route,
+        "distance": {"text": _distance_text(distance), "value": distance},
+        "duration": {"text": _duration_text(duration), "value": duration},
+        "start_address": detour.get("start_address"),
+        "steps": spliced_steps,
+    }
+    points, _ = route_points(spliced)
+    if len(points):
+        tolerance = zoom_tolerance_m(max(DEFAULT_ZOOMS), float(points[:, 0].mean()))
+        spliced["polyline"] = encode_polyline(simplify(points, tolerance))
+    spliced.pop("transport_spots", None)
+    spliced.pop("geometry", None)
+    spliced.pop("route_id", None)
+    return spliced
@@ -0,0 +1,133 @@
+# backend/utils/sqlite_cache.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "cache")
+MAPS_CACHE_DB = os.getenv("MAPS_CACHE_DB") or os.path.join(CACHE_DIR, "maps.sqlite3")
+
+
+class SQLiteCache:
+    """
+    Persistent JSON key/value cache in one SQLite table, so answers survive
+    process restarts. Rows carry their own expiry; when `max_rows` is set the
+    least recently read rows are dropped once the table grows past it.
+    """
+
+    def __init__(self, table: str, path: str = MAPS_CACHE_DB, max_rows: Optional[int] = None):
+        if not table.isidentifier():
+            raise ValueError(f"invalid table name: {table!r}")
+        self.table = table
+        self.path = path
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " stored_at REAL NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)")
+
+    def lookup(self, key: str) -> Tuple[bool, Any, float]:
+        """Return (found, value, stored_at); expired rows count as misses and are removed."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, stored_at, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return False, None, 0.0
+
+            value, stored_at, expires_at = row
+            if expires_at <= now:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self.misses += 1
+                return False, None, 0.0
+
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return True, json.loads(value), stored_at
+
+    def get(self, key: str, default: Any = None) -> Any:
+        found, value, _ = self.lookup(key)
+        return value if found else default
+
+    def set(self, key: str, value: Any, ttl_s: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, stored_at, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(value), now, now + ttl_s, now),
+            )
+            if self.max_rows is not None:
+                self._evict_locked()
+
+    def set_many(self, items: Dict[str, Any], ttl_s: float, replace: bool = True) -> None:
+        """Store several values in one transaction; replace=False keeps rows that already exist."""
+        if not items:
+            return
+        now = time.time()
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    f"{verb} INTO {self.table} (key, value, stored_at, expires_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    [(key, json.dumps(value), now, now + ttl_s, now) for key, value in items.items()],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            if self.max_rows is not None:
+                self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        overflow = count - self.max_rows
+        if overflow <= 0:
+            return
+        self._conn.execute(
+            f"DELETE FROM {self.table} WHERE key IN"
+            f" (SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)",
+            (overflow,),
+        )
+        self.evictions += overflow
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cur = self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),))
+            return cur.rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        return count
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "max_entries": self.max_rows,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,201 @@
+# backend/utils/terminal_index.py
+import csv
+import heapq
+import json
+import math
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.geo_cache import EARTH_RADIUS_M, haversine_m
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+TERMINALS_PATH = os.getenv("TRANSPORT_TERMINALS_PATH") or os.path.join(DATA_DIR, "transport_terminals.csv")
+
+TERMINAL_KINDS = ("jeep", "trike", "bus")
+CSV_FIELDS = ["id", "kind", "name", "address", "lat", "lng"]
+
+
+class _KDTree:
+    """Static 2-d tree over projected (x, y) meters; leaves carry the row index."""
+
+    def __init__(self, points: List[Tuple[float, float, int]]):
+        self._root = self._build(list(points), 0)
+
+    def _build(self, points, depth):
+        if not points:
+            return None
+        axis = depth % 2
+        points.sort(key=lambda p: p[axis])
+        mid = len(points) // 2
+        return (
+            points[mid],
+            axis,
+            self._build(points[:mid], depth + 1),
+            self._build(points[mid + 1:], depth + 1),
+        )
+
+    def within(self, x: float, y: float, radius: float) -> List[Tuple[float, int]]:
+        """All (squared distance, index) pairs within `radius` meters."""
+        found = []
+        r2 = radius * radius
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            (px, py, idx), axis, left, right = node
+            d2 = (px - x) ** 2 + (py - y) ** 2
+            if d2 <= r2:
+                found.append((d2, idx))
+            diff = (x if axis == 0 else y) - (px if axis == 0 else py)
+            near, far = (left, right) if diff < 0 else (right, left)
+            stack.append(near)
+            if diff * diff <= r2:
+                stack.append(far)
+        return found
+
+    def nearest(self, x: float, y: float, k: int, max_radius: Optional[float] = None) -> List[Tuple[float, int]]:
+        """The k nearest (squared distance, index) pairs, optionally capped at max_radius."""
+        best: List[Tuple[float, int]] = []  # max-heap via negated distances
+        bound = math.inf if max_radius is None else max_radius * max_radius
+
+        def _visit(node):
+            if node is None:
+                return
+            (px, py, idx), axis, left, right = node
+            d2 = (px - x) ** 2 + (py - y) ** 2
+            limit = -best[0][0] if len(best) == k else bound
+            if d2 <= min(limit, bound):
+                heapq.heappush(best, (-d2, idx))
+                if len(best) > k:
+                    heapq.heappop(best)
+            diff = (x if axis == 0 else y) - (px if axis == 0 else py)
+            near, far = (left, right) if diff < 0 else (right, left)
+            _visit(near)
+            limit = -best[0][0] if len(best) == k else bound
+            if diff * diff <= limit:
+                _visit(far)
+
+        _visit(self._root)
+        return sorted((-neg, idx) for neg, idx in best)
+
+
+class TerminalIndex:
+    """
+    In-memory spatial index of known sakayan terminals, one KD-tree per kind.
+    Coordinates are projected to local meters around the dataset's mean
+    latitude, which is accurate to well under a meter at city scale.
+    """
+
+    def __init__(self, terminals: List[Dict[str, Any]]):
+        self.terminals = terminals
+        self.ref_lat = (sum(t["lat"] for t in terminals) / len(terminals)) if terminals else 0.0
+        self._cos_ref = math.cos(math.radians(self.ref_lat))
+        self._trees: Dict[str, _KDTree] = {}
+        self._counts: Dict[str, int] = {}
+
+        by_kind: Dict[str, List[Tuple[float, float, int]]] = {}
+        for idx, terminal in enumerate(terminals):
+            x, y = self._project(terminal["lat"], terminal["lng"])
+            by_kind.setdefault(terminal["kind"], []).append((x, y, idx))
+        for kind, points in by_kind.items():
+            self._trees[kind] = _KDTree(points)
+            self._counts[kind] = len(points)
+
+    def _project(self, lat: float, lng: float) -> Tuple[float, float]:
+        return (
+            EARTH_RADIUS_M * math.radians(lng) * self._cos_ref,
+            EARTH_RADIUS_M * math.radians(lat),
+        )
+
+    def _rows(self, hits: List[Tuple[float, int]], lat: float, lng: float) -> List[Dict[str, Any]]:
+        ranked = []
+        for _, idx in hits:
+            terminal = self.terminals[idx]
+            ranked.append((haversine_m(lat, lng, terminal["lat"], terminal["lng"]), idx))
+        ranked.sort()
+
+        rows = []
+        for dist, idx in ranked:
+            terminal = dict(self.terminals[idx])
+            terminal["distance_m"] = round(dist)
+            rows.append(terminal)
+        return rows
+
+    def within(self, kind: str, lat: float, lng: float, radius_m: float) -> List[Dict[str, Any]]:
+        """Terminals of `kind` within radius_m, nearest first."""
+        tree = self._trees.get(kind)
+        if tree is None:
+            return []
+        x, y = self._project(lat, lng)
+        # the projection drifts ~0.1% across a city; over-fetch slightly and filter exactly
+        rows = self._rows(tree.within(x, y, radius_m * 1.01 + 1.0), lat, lng)
+        return [row for row in rows if haversine_m(lat, lng, row["lat"], row["lng"]) <= radius_m]
+
+    def nearest(self, kind: str, lat: float, lng: float, k: int = 5, max_radius_m: Optional[float] = None) -> List[Dict[str, Any]]:
+        """The k terminals of `kind` nearest to lat/lng."""
+        tree = self._trees.get(kind)
+        if tree is None or k <= 0:
+            return []
+        x, y = self._project(lat, lng)
+        max_radius = None if max_radius_m is None else max_radius_m * 1.01 + 1.0
+        rows = self._rows(tree.nearest(x, y, k + 2, max_radius), lat, lng)
+        if max_radius_m is not None:
+            rows = [row for row in rows if haversine_m(lat, lng, row["lat"], row["lng"]) <= max_radius_m]
+        return rows[:k]
+
+    def __len__(self) -> int:
+        return len(self.terminals)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"terminals": len(self.terminals), "by_kind": dict(self._counts)}
+
+
+def _terminal_row(raw: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    kind = (raw.get("kind") or "").strip().lower()
+    if kind not in TERMINAL_KINDS:
+        return None
+    try:
+        lat = float(raw["lat"])
+        lng = float(raw["lng"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return {
+        "place_id": str(raw.get("id") or f"local:{kind}:{lat:.6f},{lng:.6f}"),
+        "kind": kind,
+        "name": raw.get("name") or None,
+        "address": raw.get("address") or None,
+        "lat": lat,
+        "lng": lng,
+        "source": "local",
+    }
+
+
+def read_terminals(path: str) -> List[Dict[str, Any]]:
+    """Read a normalized terminal file: CSV with CSV_FIELDS, or GeoJSON Points with those properties."""
+    raws: List[Dict[str, Any]] = []
+    if path.lower().endswith((".geojson", ".json")):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for feature in data.get("features", []):
+            geometry = feature.get("geometry") or {}
+            if geometry.get("type") != "Point":
+                continue
+            lng, lat = geometry["coordinates"][:2]
+            raws.append({**(feature.get("properties") or {}), "lat": lat, "lng": lng})
+    else:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            raws.extend(csv.DictReader(f))
+
+    return [row for row in (_terminal_row(raw) for raw in raws) if row is not None]
+
+
+def load_terminal_index(path: str = TERMINALS_PATH) -> TerminalIndex:
+    """Build the index from `path`; a missing file yields an empty index (Places is used everywhere)."""
+    if not os.path.exists(path):
+        return TerminalIndex([])
+    try:
+        return TerminalIndex(read_terminals(path))
+    except Exception as e:
+        print(f"[terminal_index] Could not load {path}: {e}")
+        return TerminalIndex([])
@@ -0,0 +1,128 @@
+# backend/utils/ttl_cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+FRESH = "fresh"
+STALE = "stale"
+
+
+class TTLCache:
+    """
+    Bounded LRU cache with per-entry TTLs and an optional stale-while-revalidate
+    window: for `stale_s` seconds after expiry an entry is still returned (as
+    STALE) so the caller can serve it and refresh in the background.
+    With `max_bytes`, entries are also evicted once the sizes `size_of`
+    estimates for them add up to more than that.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_s: float = 300, stale_s: float = 0,
+                 max_bytes: Optional[int] = None, size_of: Optional[Callable[[Any], int]] = None):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.stale_s = stale_s
+        self.max_bytes = max_bytes
+        self.size_of = size_of
+        self._bytes = 0
+        self._entries: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._refreshing: set = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, key: Hashable) -> Tuple[Optional[str], Any]:
+        """Return (FRESH | STALE | None, value)."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, None
+
+            age = now - entry["ts"]
+            if age < entry["ttl"]:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return FRESH, entry["value"]
+
+            if age < entry["ttl"] + entry["stale"]:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                return STALE, entry["value"]
+
+            self._drop_locked(key)
+            self.misses += 1
+            return None, None
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a fresh value, or `default` when missing or stale."""
+        state, value = self.lookup(key)
+        return value if state == FRESH else default
+
+    def _drop_locked(self, key: Hashable) -> Dict[str, Any]:
+        entry = self._entries.pop(key)
+        self._bytes -= entry["size"]
+        return entry
+
+    def set(self, key: Hashable, value: Any, ttl_s: Optional[float] = None, stale_s: Optional[float] = None) -> None:
+        size = self.size_of(value) if self.size_of is not None else 0
+        with self._lock:
+            if key in self._entries:
+                self._drop_locked(key)
+            self._entries[key] = {
+                "value": value,
+                "ts": time.time(),
+                "ttl": self.ttl_s if ttl_s is None else ttl_s,
+                "stale": self.stale_s if stale_s is None else stale_s,
+                "size": size,
+            }
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes and len(self._entries) > 1
+            ):
+                self._drop_locked(next(iter(self._entries)))
+                self.evictions += 1
+
+    def begin_refresh(self, key: Hashable) -> bool:
+        """Claim the background refresh for a stale key; False if one is already running."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key: Hashable) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._drop_locked(key) if key in self._entries else None
+        return default if entry is None else entry["value"]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        stats = {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
+        if self.max_bytes is not None:
+            stats["bytes"] = self._bytes
+            stats["max_bytes"] = self.max_bytes
+        return stats